@@ -0,0 +1,121 @@
+"""
+Idempotency — replay the stored response for retried POSTs carrying an Idempotency-Key header.
+Keys live in the Redis instance already used for the ARQ job queue.
+"""
+
+import hashlib
+from typing import Any, Awaitable, Callable, Optional
+
+import orjson
+import structlog
+from fastapi import Header, HTTPException, Request
+from fastapi.encoders import jsonable_encoder
+from starlette.datastructures import UploadFile
+
+logger = structlog.get_logger()
+
+IDEMPOTENCY_TTL_SECONDS = 24 * 60 * 60
+# The in-flight marker only needs to outlive one request; if the request dies mid-flight
+# (worker killed, timeout), retries can claim the key again after this
+IDEMPOTENCY_PENDING_TTL_SECONDS = 5 * 60
+# Uploaded files are hashed this many bytes at a time
+FINGERPRINT_CHUNK_SIZE = 1024 * 1024
+
+
+class IdempotencyGuard:
+    """Claims an idempotency key for one request and stores its response."""
+
+    def __init__(self, redis: Any, key: Optional[str], fingerprint: str = ""):
+        self.redis = redis
+        self.key = key
+        self.fingerprint = fingerprint
+
+    async def run(
+        self,
+        handler: Callable[[], Awaitable[Any]],
+        should_store: Optional[Callable[[Any], bool]] = None,
+    ) -> Any:
+        """
+        Run handler once per key.
+
+        A completed duplicate gets the stored response; a duplicate of a request
+        still in flight gets 409; the key reused with a different request (query,
+        form fields or file contents) gets 422. Failed requests — ones that raise, or whose response
+        `should_store` rejects — release the key so they can be retried.
+        """
+        if self.key is None:
+            return await handler()
+
+        # The claim holds the request fingerprint, so a reused key can be told apart from a retry
+        if not await self.redis.set(self.key, self.fingerprint, nx=True, ex=IDEMPOTENCY_PENDING_TTL_SECONDS):
+            claimed = await self.redis.get(self.key)
+            if isinstance(claimed, bytes):
+                claimed = claimed.decode()
+            if claimed is not None and claimed != self.fingerprint:
+                raise HTTPException(
+                    status_code=422,
+                    detail="This Idempotency-Key was already used with a different request.",
+                )
+            stored = await self.redis.get(f"{self.key}:resp")
+            if stored is None:
+                raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is still in progress.")
+            logger.info("Idempotent replay", key=self.key)
+            return orjson.loads(stored)
+
+        try:
+            response = await handler()
+        except Exception:
+            await self.redis.delete(self.key)
+            raise
+
+        if should_store is not None and not should_store(response):
+            await self.redis.delete(self.key)
+            return response
+
+        await self.redis.set(
+            f"{self.key}:resp",
+            orjson.dumps(jsonable_encoder(response)),
+            ex=IDEMPOTENCY_TTL_SECONDS,
+        )
+        # The claim now lives as long as the stored response it guards
+        await self.redis.expire(self.key, IDEMPOTENCY_TTL_SECONDS)
+        return response
+
+
+async def _request_fingerprint(request: Request) -> str:
+    """Hash the query string plus the body (form fields and uploaded file contents for forms)."""
+    hasher = hashlib.sha256()
+    for name, value in sorted(request.query_params.multi_items()):
+        hasher.update(f"q:{name}={value}\n".encode())
+
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith(("multipart/form-data", "application/x-www-form-urlencoded")):
+        # Raw multipart bodies differ per request (random boundary), so hash the parsed form;
+        # FastAPI has already parsed it, so this reads the cached form
+        form = await request.form()
+        for name, value in sorted(form.multi_items(), key=lambda item: item[0]):
+            if isinstance(value, UploadFile):
+                file_hasher = hashlib.sha256()
+                while chunk := await value.read(FINGERPRINT_CHUNK_SIZE):
+                    file_hasher.update(chunk)
+                await value.seek(0)
+                hasher.update(f"f:{name}={file_hasher.hexdigest()}\n".encode())
+            else:
+                hasher.update(f"v:{name}={value}\n".encode())
+    else:
+        hasher.update(await request.body())
+    return hasher.hexdigest()
+
+
+async def idempotency(
+    request: Request,
+    idempotency_key: Optional[str] = Header(default=None),
+) -> IdempotencyGuard:
+    """FastAPI dependency scoping the Idempotency-Key header to the request path."""
+    if not idempotency_key:
+        return IdempotencyGuard(request.app.state.arq, None)
+    return IdempotencyGuard(
+        request.app.state.arq,
+        f"idem:{request.url.path}:{idempotency_key}",
+        await _request_fingerprint(request),
+    )
@@ -0,0 +1,55 @@
+"""
+Upload Index — in-process document_id → (path, size) cache.
+Populated at upload time and consulted by /extract before the DB or filesystem.
+"""
+
+import asyncio
+import glob
+import os
+import time
+from collections import OrderedDict
+from typing import Optional
+
+MAX_ENTRIES = 4096
+TTL_SECONDS = 3600
+
+# document_id → (file_path, size_bytes, inserted_at); ordered oldest → most recently used
+_path_cache: OrderedDict[str, tuple[str, int, float]] = OrderedDict()
+_lock = asyncio.Lock()
+
+
+async def remember(document_id: str, file_path: str, size: int):
+    """Record where an upload lives, evicting the least recently used entry when full."""
+    async with _lock:
+        _path_cache[document_id] = (file_path, size, time.monotonic())
+        _path_cache.move_to_end(document_id)
+        while len(_path_cache) > MAX_ENTRIES:
+            _path_cache.popitem(last=False)
+
+
+async def lookup(document_id: str) -> Optional[tuple[str, int]]:
+    """Return (file_path, size) for a fresh entry, or None on miss/expiry."""
+    async with _lock:
+        entry = _path_cache.get(document_id)
+        if entry is None:
+            return None
+        file_path, size, inserted_at = entry
+        if time.monotonic() - inserted_at > TTL_SECONDS:
+            del _path_cache[document_id]
+            return None
+        _path_cache.move_to_end(document_id)
+        return file_path, size
+
+
+async def purge() -> int:
+    """Drop every entry and return how many were removed."""
+    async with _lock:
+        count = len(_path_cache)
+        _path_cache.clear()
+        return count
+
+
+def find_upload_path(upload_dir: str | os.PathLike, document_id: str) -> Optional[str]:
+    """Locate an upload on disk by its document_id prefix (blocking; run in a thread)."""
+    matches = glob.glob(os.path.join(os.fspath(upload_dir), f"{glob.escape(document_id)}.*"))
+    return matches[0] if matches else None
@@ -0,0 +1,26 @@
+"""
+Admin API — Operational controls.
+POST /api/admin/cache/purge
+"""
+
+import structlog
+from fastapi import APIRouter, Request
+
+from api import _upload_index as upload_index
+from api.extract import purge_results_cache
+
+logger = structlog.get_logger()
+router = APIRouter()
+
+
+@router.post("/admin/cache/purge")
+async def purge_caches(request: Request):
+    """
+    Clear the in-process upload path index and the shared extraction result cache.
+    """
+    purged = {
+        "upload_index": await upload_index.purge(),
+        "extraction_results": await purge_results_cache(request.app.state.arq),
+    }
+    logger.info("Caches purged", **purged)
+    return {"status": "purged", "entries": purged}
@@ -1,10 +1,18 @@
+import hashlib
 import os
+import uuid
+
+import anyio
+import orjson
 import structlog
-from fastapi import APIRouter, HTTPException, BackgroundTasks
+from redis.exceptions import RedisError
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 
-from models.schemas import ExtractionResult, ProcessingStatus, FinancialStatement, LineItem, ValidationResults, AgentType
-from services.pipeline_service import ExtractionPipelineService
-from database.client import db
+from models.schemas import ExtractionResult, AgentType, PipelineStage
+from config import UPLOAD_DIR
+from database.client import DatabaseClient, get_db
+from api import _upload_index as upload_index
+from api._idempotency import IdempotencyGuard, idempotency
 
 logger = structlog.get_logger()
 router = APIRouter()
@@ -12,102 +20,78 @@ router = APIRouter()
 # In-memory store deprecated, now using Supabase via backend.database.client.db
 # _extractions: dict[str, ExtractionResult] = {}
 
-async def run_extraction_pipeline(document_id: str, file_path: str, agent_type: AgentType = AgentType.CLAUDE_SPECIALIST, extraction_db_id: str = None):
-    """Background task to run the extraction pipeline."""
-    try:
-        service = ExtractionPipelineService(document_id, file_path, agent_type=agent_type, extraction_db_id=extraction_db_id)
-        status = await service.run()
-        
-        if status.stage == "complete":
-            # Map pipeline results back to the Pydantic model
-            results = status.results
-            statements_data = results.get("statements", {})
-            
-            # Helper to create FinancialStatement from standardized labels
-            def build_statement(statement_type: str):
-                line_items = []
-                # Simple mapping for now
-                for label, values in statements_data.items():
-                    # This is naive; normally we'd check if the label belongs to the statement type
-                    # But for now, we'll just put everything in if it has values
-                    line_items.append(LineItem(
-                        label=label.replace("_", " ").title(),
-                        standardized_label=label,
-                        values=values,
-                        confidence=0.9
-                    ))
-                return FinancialStatement(periods=results.get("periods", []), line_items=line_items)
-
-            # Update Supabase
-            if extraction_db_id:
-                final_result = ExtractionResult(
-                    document_id=document_id,
-                    status=ProcessingStatus.COMPLETED,
-                    quality_score=results.get("quality_score", 0),
-                    statements={
-                        "income_statement": build_statement("income_statement"),
-                        "balance_sheet": build_statement("balance_sheet"),
-                        "cash_flow_statement": build_statement("cash_flow_statement"),
-                    },
-                    calculated_metrics=results.get("metrics", {}),
-                    selected_agent=agent_type,
-                    validation=ValidationResults(
-                        quality_score=results.get("quality_score", 0),
-                    )
-                )
-                await db.save_extraction({
-                    "id": extraction_db_id,
-                    "extraction_id": document_id, # Simplified for demo
-                    "status": "completed",
-                    "quality_score": results.get("quality_score", 0),
-                    "structured_data": final_result.model_dump()
-                })
-            
-            logger.info("Background extraction complete", document_id=document_id)
-        else:
-            if extraction_db_id:
-                await db.save_extraction({"id": extraction_db_id, "status": "failed"})
-            logger.error("Background extraction failed", document_id=document_id, errors=status.errors)
-            
-    except Exception as e:
-        logger.error("Error in background pipeline", document_id=document_id, error=str(e))
-        if extraction_db_id:
-             await db.save_extraction({"id": extraction_db_id, "status": "failed"})
+# Terminal (completed/failed) extraction results are cached in Redis, keyed by document_id.
+# Shared across API workers, so a re-trigger handled by one worker invalidates it for all.
+TERMINAL_STATUSES = {"completed", "failed"}
+RESULTS_CACHE_PREFIX = "extraction_result:"
+RESULTS_CACHE_TTL_SECONDS = 60
+
+
+async def purge_results_cache(redis) -> int:
+    """Drop all cached extraction results and return how many were removed."""
+    keys = [key async for key in redis.scan_iter(match=f"{RESULTS_CACHE_PREFIX}*")]
+    return await redis.delete(*keys) if keys else 0
+
 
 @router.post("/extract")
-async def trigger_extraction(document_id: str, background_tasks: BackgroundTasks, agent_type: AgentType = AgentType.CLAUDE_SPECIALIST):
+async def trigger_extraction(
+    document_id: str,
+    request: Request,
+    agent_type: AgentType = AgentType.CLAUDE_SPECIALIST,
+    stages: list[PipelineStage] | None = Query(default=None),
+    db: DatabaseClient = Depends(get_db),
+    idem: IdempotencyGuard = Depends(idempotency),
+):
     """
     Trigger extraction pipeline on an uploaded document.
+    Pass `stages` (repeatable) to run only those stages, e.g. skip `ner` for table-only spreading.
+    Retries carrying the same Idempotency-Key header get the original response.
     """
-    # Find the uploaded file in .tmp/uploads/
-    upload_dir = os.path.join(os.path.dirname(__file__), "..", "..", ".tmp", "uploads")
-    file_path = None
-    if os.path.exists(upload_dir):
-        for f in os.listdir(upload_dir):
-            if f.startswith(document_id):
-                file_path = os.path.join(upload_dir, f)
-                break
-    
-    if not file_path:
-        raise HTTPException(
-            status_code=404,
-            detail=f"Document file for {document_id} not found. Did you upload it?"
-        )
+    stage_values = [stage.value for stage in stages] if stages else None
+    return await idem.run(
+        lambda: _start_extraction(document_id, agent_type, db, request.app.state.arq, stage_values)
+    )
+
+
+async def _start_extraction(document_id: str, agent_type: AgentType, db: DatabaseClient, arq, stages: list[str] | None = None) -> dict:
+    """Register the extraction and enqueue its pipeline job."""
+    # Resolve the uploaded file: in-process index → document row → uploads directory
+    doc_uuid = None
+    cached = await upload_index.lookup(document_id)
+    if cached:
+        file_path, file_size = cached
+        doc_uuid = document_id  # Indexed uploads always have a document row
+    else:
+        document = await db.get_document(document_id)
+        if document:
+            file_path, file_size, doc_uuid = document["storage_path"], document["file_size_bytes"], document["id"]
+        else:
+            file_path = await anyio.to_thread.run_sync(upload_index.find_upload_path, UPLOAD_DIR, document_id)
+            if not file_path:
+                raise HTTPException(
+                    status_code=404,
+                    detail=f"Document file for {document_id} not found. Did you upload it?"
+                )
+            file_size = await anyio.to_thread.run_sync(os.path.getsize, file_path)
 
     logger.info("Extraction triggered", document_id=document_id, file=file_path)
 
-    # 1. Create Document record in Supabase (Mocked user_id/org_id for now)
     try:
-        doc_uuid = await db.save_document({
-            "uploaded_by": "00000000-0000-0000-0000-000000000000",
-            "organization_id": "00000000-0000-0000-0000-000000000000",
-            "filename": os.path.basename(file_path),
-            "file_type": "pdf",
-            "file_size_bytes": os.path.getsize(file_path),
-            "storage_path": file_path
-        })
+        # 1. Create Document record in Supabase for files uploaded without one (Mocked user_id/org_id for now)
+        if doc_uuid is None:
+            doc_uuid = await db.save_document({
+                "id": document_id,
+                "uploaded_by": "00000000-0000-0000-0000-000000000000",
+                "organization_id": "00000000-0000-0000-0000-000000000000",
+                "filename": os.path.basename(file_path),
+                "file_type": "pdf",
+                "file_size_bytes": file_size,
+                "storage_path": file_path
+            })
+        await upload_index.remember(document_id, file_path, file_size)
 
-        # 2. Create Extraction record
+        # 2. Create Extraction record (a re-run makes any cached terminal result stale)
+        await arq.delete(f"{RESULTS_CACHE_PREFIX}{document_id}")
         extraction_db_id = await db.save_extraction({
             "document_id": doc_uuid,
             "extraction_id": document_id,
@@ -116,14 +100,30 @@ async def trigger_extraction(document_id: str, background_tasks: BackgroundTasks
             "structured_data": {"status": "starting"}
         })
 
-        # 3. Start background task
-        background_tasks.add_task(run_extraction_pipeline, document_id, file_path, agent_type=agent_type, extraction_db_id=extraction_db_id)
+        # Stage checkpoints are per run; a previous failed run (possibly with another agent
+        # or stage selection) must not be resumed by this one
+        await db.clear_stage_outputs(extraction_db_id)
+
+        # 3. Enqueue pipeline job. Every run of a document shares one extraction row, and ARQ
+        # drops an enqueue while a job (or its kept result) holds the id, so each trigger gets
+        # its own run id; retries of one trigger are deduped by the idempotency key instead.
+        run_id = uuid.uuid4().hex
+        await arq.enqueue_job(
+            "run_extraction_pipeline",
+            document_id,
+            file_path,
+            agent_type,
+            extraction_db_id,
+            stages,
+            run_id,
+            _job_id=f"{extraction_db_id}:{run_id}",
+        )
 
         return {
             "extraction_id": document_id,
             "document_id": doc_uuid,
             "status": "processing",
-            "message": "Extraction pipeline started in background (Persisted to Supabase).",
+            "message": "Extraction pipeline queued (Persisted to Supabase).",
         }
     except Exception as e:
         logger.error("Failed to initialize database records", error=str(e))
@@ -131,56 +131,92 @@ async def trigger_extraction(document_id: str, background_tasks: BackgroundTasks
 
 
 @router.get("/extraction/{document_id}", response_model=ExtractionResult)
-async def get_extraction_results(document_id: str):
+async def get_extraction_results(document_id: uuid.UUID, request: Request, db: DatabaseClient = Depends(get_db)):
     """
     Get extraction results from Supabase.
+    Completed/failed results are served from a short-lived Redis cache.
+    Extraction ids are UUIDs; anything else is rejected with 422 before touching the database.
     """
+    document_id = str(document_id)
+    redis = request.app.state.arq
+    cache_key = f"{RESULTS_CACHE_PREFIX}{document_id}"
+    try:
+        cached = await redis.get(cache_key)
+    except RedisError as e:
+        logger.warning("Extraction result cache read failed", error=str(e))
+        cached = None
+    if cached is not None:
+        return orjson.loads(cached)
+
     # Note: extraction_id in our URL maps to extraction_id column in DB
     try:
-        res = db.client.table("extractions").select("*").eq("extraction_id", document_id).execute()
-        if not res.data:
+        data = await db.get_extraction_result(document_id)
+        if not data:
              raise HTTPException(status_code=404, detail=f"No extraction found for ID {document_id}")
-        
-        data = res.data[0]
+
         # Return the structured_data portion which is the ExtractionResult model
-        return data.get("structured_data")
+        result = data.get("structured_data")
+        if data.get("status") in TERMINAL_STATUSES:
+            try:
+                await redis.set(cache_key, orjson.dumps(result), ex=RESULTS_CACHE_TTL_SECONDS)
+            except RedisError as e:
+                logger.warning("Extraction result cache write failed", error=str(e))
+        return result
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error("Failed to query database", error=str(e))
         raise HTTPException(status_code=500, detail="Error retrieving result from database.")
 
 
+# Static agent catalogue, serialized once at import time
+_AGENTS_JSON = orjson.dumps([
+    {
+        "id": AgentType.CLAUDE_SPECIALIST,
+        "name": "Claude Specialist",
+        "description": "High-precision GAAP extraction and label mapping (Claude 3.5 Sonnet / Opus 4.6).",
+        "capabilities": ["Precision Mapping", "Zero-Shot NER", "Semantic Alignment"],
+        "cost_tier": "Premium"
+    },
+    {
+        "id": AgentType.GEMINI_ARCHIVIST,
+        "name": "Gemini Archivist",
+        "description": "Best for multi-hundred page documents and rapid context retrieval (Gemini 1.5 Pro).",
+        "capabilities": ["2M Token Window", "Fast Ingestion", "GCP Credits Safe"],
+        "cost_tier": "Free (Credits)"
+    },
+    {
+        "id": AgentType.DEEPSEEK_MATHEMATICIAN,
+        "name": "DeepSeek Mathematician",
+        "description": "Optimized for quantitative reasoning, formula validation, and stress-testing math.",
+        "capabilities": ["Verifiable Math", "Chain-of-Thought Reasoning", "Quantitative Finance"],
+        "cost_tier": "Economy"
+    },
+    {
+        "id": AgentType.GPT_PROPHET,
+        "name": "GPT Prophet",
+        "description": "Strong generalist for predictive analysis, trend forecasting, and earnings narrative synthesis.",
+        "capabilities": ["Trend Analysis", "Narrative Synthesis", "Market Baseline"],
+        "cost_tier": "Standard"
+    }
+])
+_AGENTS_ETAG = f'"{hashlib.sha256(_AGENTS_JSON).hexdigest()[:16]}"'
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """If-None-Match check: `*` or any listed tag, compared weakly (a W/ prefix is ignored)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
 @router.get("/agents")
-async def list_agents():
+async def list_agents(request: Request):
     """
     List available specialized agents for financial analysis.
     """
-    return [
-        {
-            "id": AgentType.CLAUDE_SPECIALIST,
-            "name": "Claude Specialist",
-            "description": "High-precision GAAP extraction and label mapping (Claude 3.5 Sonnet / Opus 4.6).",
-            "capabilities": ["Precision Mapping", "Zero-Shot NER", "Semantic Alignment"],
-            "cost_tier": "Premium"
-        },
-        {
-            "id": AgentType.GEMINI_ARCHIVIST,
-            "name": "Gemini Archivist",
-            "description": "Best for multi-hundred page documents and rapid context retrieval (Gemini 1.5 Pro).",
-            "capabilities": ["2M Token Window", "Fast Ingestion", "GCP Credits Safe"],
-            "cost_tier": "Free (Credits)"
-        },
-        {
-            "id": AgentType.DEEPSEEK_MATHEMATICIAN,
-            "name": "DeepSeek Mathematician",
-            "description": "Optimized for quantitative reasoning, formula validation, and stress-testing math.",
-            "capabilities": ["Verifiable Math", "Chain-of-Thought Reasoning", "Quantitative Finance"],
-            "cost_tier": "Economy"
-        },
-        {
-            "id": AgentType.GPT_PROPHET,
-            "name": "GPT Prophet",
-            "description": "Strong generalist for predictive analysis, trend forecasting, and earnings narrative synthesis.",
-            "capabilities": ["Trend Analysis", "Narrative Synthesis", "Market Baseline"],
-            "cost_tier": "Standard"
-        }
-    ]
+    if _etag_matches(request.headers.get("if-none-match"), _AGENTS_ETAG):
+        return Response(status_code=304, headers={"ETag": _AGENTS_ETAG})
+    return Response(content=_AGENTS_JSON, media_type="application/json", headers={"ETag": _AGENTS_ETAG})
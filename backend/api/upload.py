@@ -3,12 +3,16 @@ Upload API — Document upload endpoint.
 POST /api/upload
 """
 
+import asyncio
+import hashlib
 import os
 import uuid
 from datetime import datetime
 
+import aiofiles
+import anyio
 import structlog
-from fastapi import APIRouter, File, Form, HTTPException, UploadFile
+from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile
 
 from models.schemas import (
     DocumentUpload,
@@ -16,6 +20,10 @@ from models.schemas import (
     ProcessingStatus,
     UploadResponse,
 )
+from config import UPLOAD_DIR
+from database.client import DatabaseClient, get_db
+from api import _upload_index as upload_index
+from api._idempotency import IdempotencyGuard, idempotency
 
 logger = structlog.get_logger()
 router = APIRouter()
@@ -33,6 +41,123 @@ ALLOWED_EXTENSIONS = {
 }
 
 MAX_FILE_SIZE = 50 * 1024 * 1024  # 50MB
+CHUNK_SIZE = 1 << 20  # 1MB read buffer per upload
+
+# Bound concurrent disk writes across parallel uploads
+_disk_write_sem = asyncio.Semaphore(8)
+
+# Placeholder until auth is wired in (matches the mocked IDs used elsewhere)
+PLACEHOLDER_UUID = "00000000-0000-0000-0000-000000000000"
+
+
+def _as_uuid(value: str) -> str:
+    """Return value if it is a UUID, otherwise the placeholder UUID."""
+    try:
+        return str(uuid.UUID(value))
+    except (ValueError, TypeError):
+        return PLACEHOLDER_UUID
+
+
+async def _process_one(file: UploadFile, uploaded_by: str, organization_id: str, db: DatabaseClient) -> UploadResponse:
+    """Validate, store, and register a single uploaded file. Never raises."""
+    try:
+        # Validate file extension
+        ext = os.path.splitext(file.filename or "")[1].lower()
+        if ext not in ALLOWED_EXTENSIONS:
+            return UploadResponse(
+                document_id="error",
+                filename=file.filename or "unknown",
+                status=ProcessingStatus.FAILED,
+                message=f"Unsupported file type: {ext}"
+            )
+
+        # Reject oversized files up front from the declared size (the chunk loop still enforces the cap)
+        declared_size = file.size or int(file.headers.get("content-length") or 0)
+        if declared_size > MAX_FILE_SIZE:
+            return UploadResponse(
+                document_id="error",
+                filename=file.filename or "unknown",
+                status=ProcessingStatus.FAILED,
+                message=f"File too large: {declared_size / 1024 / 1024:.1f}MB. Max: 50MB."
+            )
+
+        # Generate document ID
+        document_id = str(uuid.uuid4())
+
+        # Stream file to disk in fixed-size chunks, hashing as we go
+        file_path = str(UPLOAD_DIR / f"{document_id}{ext}")
+
+        file_size = 0
+        hasher = hashlib.sha256()
+        async with _disk_write_sem:
+            async with aiofiles.open(file_path, "wb") as f:
+                while chunk := await file.read(CHUNK_SIZE):
+                    file_size += len(chunk)
+                    if file_size > MAX_FILE_SIZE:
+                        break
+                    hasher.update(chunk)
+                    await f.write(chunk)
+
+        # Validate file size
+        if file_size > MAX_FILE_SIZE:
+            await anyio.to_thread.run_sync(os.remove, file_path)
+            return UploadResponse(
+                document_id="error",
+                filename=file.filename or "unknown",
+                status=ProcessingStatus.FAILED,
+                message="File too large. Max: 50MB."
+            )
+
+        content_hash = hasher.hexdigest()
+        org_id = _as_uuid(organization_id)
+
+        # Re-upload of identical content: reuse the existing document
+        existing = await db.get_document_by_hash(content_hash, org_id)
+        if existing:
+            await anyio.to_thread.run_sync(os.remove, file_path)
+            logger.info("Duplicate upload short-circuited", document_id=existing["id"], content_hash=content_hash)
+            return UploadResponse(
+                document_id=existing["id"],
+                filename=file.filename or "unknown",
+                status=ProcessingStatus.PENDING,
+                message="Document already uploaded."
+            )
+
+        await db.save_document({
+            "id": document_id,
+            "uploaded_by": _as_uuid(uploaded_by),
+            "organization_id": org_id,
+            "filename": file.filename or "unknown",
+            "file_type": ALLOWED_EXTENSIONS[ext].value,
+            "file_size_bytes": file_size,
+            "storage_path": file_path,
+            "content_hash": content_hash,
+        })
+        await upload_index.remember(document_id, file_path, file_size)
+
+        logger.info(
+            "Document uploaded",
+            document_id=document_id,
+            filename=file.filename,
+            file_type=ext,
+            size_bytes=file_size,
+        )
+
+        return UploadResponse(
+            document_id=document_id,
+            filename=file.filename or "unknown",
+            status=ProcessingStatus.PENDING,
+            message="Document uploaded successfully."
+        )
+
+    except Exception as e:
+        logger.error("Upload failed", filename=file.filename, error=str(e))
+        return UploadResponse(
+            document_id="error",
+            filename=file.filename or "unknown",
+            status=ProcessingStatus.FAILED,
+            message=f"Internal error during upload: {str(e)}"
+        )
 
 
 @router.post("/upload", response_model=list[UploadResponse])
@@ -40,75 +165,24 @@ async def upload_documents(
     files: list[UploadFile] = File(...),
     uploaded_by: str = Form(default="anonymous"),
     organization_id: str = Form(default="default"),
+    db: DatabaseClient = Depends(get_db),
+    idem: IdempotencyGuard = Depends(idempotency),
 ):
     """
     Upload financial documents for extraction (supports bulk).
 
     Accepts multiple PDF, DOCX, XLSX, CSV, and image files.
-    Max file size per file: 50MB.
+    Max file size per file: 50MB. Files are processed concurrently.
+    Retries carrying the same Idempotency-Key header get the original response.
     """
-    responses = []
-    
-    for file in files:
-        try:
-            # Validate file extension
-            ext = os.path.splitext(file.filename or "")[1].lower()
-            if ext not in ALLOWED_EXTENSIONS:
-                responses.append(UploadResponse(
-                    document_id="error",
-                    filename=file.filename or "unknown",
-                    status=ProcessingStatus.FAILED,
-                    message=f"Unsupported file type: {ext}"
-                ))
-                continue
-
-            # Read file content
-            content = await file.read()
-            file_size = len(content)
-
-            # Validate file size
-            if file_size > MAX_FILE_SIZE:
-                responses.append(UploadResponse(
-                    document_id="error",
-                    filename=file.filename or "unknown",
-                    status=ProcessingStatus.FAILED,
-                    message=f"File too large: {file_size / 1024 / 1024:.1f}MB. Max: 50MB."
-                ))
-                continue
-
-            # Generate document ID
-            document_id = str(uuid.uuid4())
-
-            # Store file locally
-            upload_dir = os.path.join(os.path.dirname(__file__), "..", "..", ".tmp", "uploads")
-            os.makedirs(upload_dir, exist_ok=True)
-            file_path = os.path.join(upload_dir, f"{document_id}{ext}")
-
-            with open(file_path, "wb") as f:
-                f.write(content)
-
-            logger.info(
-                "Document uploaded",
-                document_id=document_id,
-                filename=file.filename,
-                file_type=ext,
-                size_bytes=file_size,
-            )
-
-            responses.append(UploadResponse(
-                document_id=document_id,
-                filename=file.filename or "unknown",
-                status=ProcessingStatus.PENDING,
-                message="Document uploaded successfully."
-            ))
-
-        except Exception as e:
-            logger.error("Upload failed", filename=file.filename, error=str(e))
-            responses.append(UploadResponse(
-                document_id="error",
-                filename=file.filename or "unknown",
-                status=ProcessingStatus.FAILED,
-                message=f"Internal error during upload: {str(e)}"
-            ))
-
-    return responses
+    async def upload_all() -> list[UploadResponse]:
+        responses = await asyncio.gather(
+            *(_process_one(file, uploaded_by, organization_id, db) for file in files)
+        )
+        return list(responses)
+
+    # A batch with a failed file isn't stored, so retrying the key actually retries the upload
+    return await idem.run(
+        upload_all,
+        should_store=lambda responses: all(r.status != ProcessingStatus.FAILED for r in responses),
+    )
@@ -0,0 +1,14 @@
+"""
+Backend configuration — process-wide constants resolved once at import.
+"""
+
+import os
+from pathlib import Path
+
+# Where uploaded documents are stored. Defaults to the repo-local .tmp directory on disk;
+# set UPLOAD_DIR to opt into a tmpfs such as /dev/shm/uploads (uploads are never deleted,
+# and tmpfs counts against container/instance memory, so size it accordingly).
+# The API and extraction workers must point at the same directory.
+_DEFAULT_UPLOAD_DIR = Path(__file__).parent.parent / ".tmp" / "uploads"
+UPLOAD_DIR = Path(os.getenv("UPLOAD_DIR") or _DEFAULT_UPLOAD_DIR).resolve()
+UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
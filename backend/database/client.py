@@ -1,25 +1,129 @@
+import asyncio
+import json
 import os
+from enum import Enum
+
+import asyncpg
+import orjson
+import zstandard as zstd
+from fastapi import Request
 from supabase import create_client, Client
 import structlog
 
 logger = structlog.get_logger()
 
+# Column order for documents inserts issued through the asyncpg pool
+DOCUMENT_COLUMNS = (
+    "id",
+    "uploaded_by",
+    "organization_id",
+    "filename",
+    "file_type",
+    "file_size_bytes",
+    "storage_path",
+    "content_hash",
+)
+
+# Write-behind batching for audit logs and status updates
+FLUSH_INTERVAL_SECONDS = 0.05
+MAX_BATCH_ROWS = 500
+MAX_BATCH_BYTES = 10 * 1024 * 1024  # ~10MB payload per multi-row statement
+
+# Extraction results are stored zstd-compressed in extractions.structured_data_z
+_zstd_compressor = zstd.ZstdCompressor(level=6)
+_zstd_decompressor = zstd.ZstdDecompressor()
+
+
+def compress_structured_data(structured_data: dict) -> bytes:
+    # Table numerics are float64 arrays; orjson writes them as nested lists (NaN → null)
+    return _zstd_compressor.compress(orjson.dumps(structured_data, option=orjson.OPT_SERIALIZE_NUMPY))
+
+
+def decompress_structured_data(payload: bytes) -> dict:
+    return orjson.loads(_zstd_decompressor.decompress(payload))
+
+
+async def _init_connection(conn: asyncpg.Connection):
+    """Encode/decode JSONB columns as Python dicts on every pooled connection."""
+    await conn.set_type_codec(
+        "jsonb",
+        encoder=lambda v: json.dumps(v, default=str),
+        decoder=json.loads,
+        schema="pg_catalog",
+    )
+
+
 class DatabaseClient:
     """
     Supabase wrapper for Finance AI SaaS persistence.
+
+    Hot writes go straight to Postgres through an asyncpg pool;
+    the supabase-py client is kept for auth/storage and ad-hoc reads.
+
+    Build one per process with `await DatabaseClient.create()` from the app/worker
+    lifespan, so connections are always opened after any fork.
     """
-    _instance = None
 
-    def __new__(cls):
-        if cls._instance is None:
-            cls._instance = super(DatabaseClient, cls).__new__(cls)
-            cls._instance._init_client()
-        return cls._instance
+    def __init__(self):
+        self.client: Client | None = None
+        self.pool: asyncpg.Pool | None = None
+        self._audit_queue: asyncio.Queue = asyncio.Queue()
+        self._status_queue: asyncio.Queue = asyncio.Queue()
+        self._flush_tasks: list[asyncio.Task] = []
+
+    @classmethod
+    async def create(cls) -> "DatabaseClient":
+        """Create a client with its Supabase connection and Postgres pool opened."""
+        instance = cls()
+        await instance.init()
+        return instance
+
+    async def init(self):
+        """Create the Supabase client and Postgres pool. Must run inside the event loop (lifespan)."""
+        self._init_client()
+
+        dsn = os.getenv("SUPABASE_DB_URL")
+        if not dsn:
+            # Every hot write goes through the pool, and the write-behind queues have no
+            # flusher without it — refuse to start rather than fail on each request
+            raise RuntimeError("Database pool initialization failed: Missing SUPABASE_DB_URL")
+
+        # Keep max_size well below Supabase's max_connections — every worker process gets its own pool
+        self.pool = await asyncpg.create_pool(
+            dsn=dsn,
+            min_size=2,
+            max_size=int(os.getenv("PG_POOL_SIZE", 10)),
+            init=_init_connection,
+        )
+        logger.info("Postgres pool initialized", max_size=self.pool.get_max_size())
+
+        self._flush_tasks = [
+            asyncio.create_task(self._flusher(self._audit_queue, self._write_audit_batch)),
+            asyncio.create_task(self._flusher(self._status_queue, self._write_status_batch)),
+        ]
+
+    async def close(self):
+        """Flush pending writes and close the Postgres pool."""
+        for task in self._flush_tasks:
+            task.cancel()
+        await asyncio.gather(*self._flush_tasks, return_exceptions=True)
+        self._flush_tasks = []
+
+        if self.pool is not None:
+            for queue, writer in (
+                (self._audit_queue, self._write_audit_batch),
+                (self._status_queue, self._write_status_batch),
+            ):
+                while not queue.empty():
+                    await self._write_batch(writer, self._drain(queue, []))
+            await self.pool.close()
+            self.pool = None
+            logger.info("Postgres pool closed")
 
     def _init_client(self):
         url = os.getenv("SUPABASE_URL")
         key = os.getenv("SUPABASE_SERVICE_ROLE_KEY") or os.getenv("SUPABASE_ANON_KEY")
-        
+
         if not url or not key:
             logger.error("Database initialization failed: Missing Supabase credentials")
             self.client = None
@@ -28,26 +132,122 @@ class DatabaseClient:
             logger.info("Supabase client initialized")
 
     async def save_document(self, doc_data: dict) -> str:
-        """Insert a document record and return its UUID."""
+        """Insert a document record (or return the existing one with the same id) and return its UUID."""
         try:
-            res = self.client.table("documents").insert(doc_data).execute()
-            return res.data[0]["id"]
+            async with self.pool.acquire() as conn:
+                doc_id = await conn.fetchval(
+                    "INSERT INTO documents (id, uploaded_by, organization_id, filename, file_type, file_size_bytes, storage_path, content_hash) "
+                    "VALUES (COALESCE($1::uuid, gen_random_uuid()), $2, $3, $4, $5, $6, $7, $8) "
+                    "ON CONFLICT (id) DO UPDATE SET storage_path = EXCLUDED.storage_path RETURNING id",
+                    *(doc_data.get(col) for col in DOCUMENT_COLUMNS),
+                )
+            return str(doc_id)
         except Exception as e:
             logger.error("Failed to save document", error=str(e))
             raise
 
+    async def get_document(self, document_id: str) -> dict | None:
+        """Fetch the stored path and size for a document by its UUID."""
+        try:
+            async with self.pool.acquire() as conn:
+                row = await conn.fetchrow(
+                    "SELECT id, storage_path, file_size_bytes FROM documents WHERE id = $1::uuid",
+                    document_id,
+                )
+            return {**dict(row), "id": str(row["id"])} if row else None
+        except Exception as e:
+            logger.error("Failed to fetch document", error=str(e))
+            return None
+
+    async def get_document_by_hash(self, content_hash: str, organization_id: str) -> dict | None:
+        """Find an already-uploaded document with identical content."""
+        try:
+            async with self.pool.acquire() as conn:
+                row = await conn.fetchrow(
+                    "SELECT id, storage_path FROM documents WHERE content_hash = $1 AND organization_id = $2 LIMIT 1",
+                    content_hash, organization_id,
+                )
+            return {"id": str(row["id"]), "storage_path": row["storage_path"]} if row else None
+        except Exception as e:
+            logger.error("Failed to look up document by hash", error=str(e))
+            return None
+
     async def save_extraction(self, extraction_data: dict) -> str:
         """Insert or update an extraction result."""
+        data = {k: (v.value if isinstance(v, Enum) else v) for k, v in extraction_data.items()}
+        if "structured_data" in data:
+            # Persist the (large, key-repetitive) result compressed; the JSONB column is left empty
+            data["structured_data_z"] = compress_structured_data(data["structured_data"])
+            data["structured_data"] = {}
         try:
-            # Upsert using extraction_id as unique constraint (requires DB configuration)
-            res = self.client.table("extractions").upsert(
-                extraction_data, on_conflict="extraction_id"
-            ).execute()
-            return res.data[0]["id"]
+            async with self.pool.acquire() as conn:
+                if "extraction_id" not in data and "id" in data:
+                    # Partial status update on an existing row
+                    cols = [c for c in data if c != "id"]
+                    assignments = ", ".join(f"{c} = ${i}" for i, c in enumerate(cols, start=2))
+                    row_id = await conn.fetchval(
+                        f"UPDATE extractions SET {assignments}, updated_at = NOW() WHERE id = $1 RETURNING id",
+                        data["id"], *(data[c] for c in cols),
+                    )
+                else:
+                    # Upsert using extraction_id as the unique constraint
+                    cols = list(data)
+                    placeholders = ", ".join(f"${i}" for i in range(1, len(cols) + 1))
+                    updates = ", ".join(f"{c} = EXCLUDED.{c}" for c in cols if c not in ("id", "extraction_id"))
+                    row_id = await conn.fetchval(
+                        f"INSERT INTO extractions ({', '.join(cols)}) VALUES ({placeholders}) "
+                        f"ON CONFLICT (extraction_id) DO UPDATE SET {updates}, updated_at = NOW() RETURNING id",
+                        *(data[c] for c in cols),
+                    )
+            return str(row_id)
         except Exception as e:
             logger.error("Failed to save extraction", error=str(e))
             raise
 
+    def queue_status_update(self, extraction_db_id: str, status: str, structured_data: dict = None):
+        """Queue a status update for an extraction row (non-blocking, flushed in batches)."""
+        payload = json.dumps(structured_data, default=str) if structured_data is not None else None
+        self._status_queue.put_nowait((extraction_db_id, status, payload))
+
+    async def get_extraction_result(self, extraction_id: str) -> dict | None:
+        """Fetch only the structured result and status for an extraction."""
+        async with self.pool.acquire() as conn:
+            row = await conn.fetchrow(
+                "SELECT structured_data_z, structured_data, status FROM extractions WHERE extraction_id = $1::uuid LIMIT 1",
+                extraction_id,
+            )
+        if not row:
+            return None
+        structured_data = (
+            decompress_structured_data(row["structured_data_z"])
+            if row["structured_data_z"] is not None
+            else row["structured_data"]
+        )
+        return {"structured_data": structured_data, "status": row["status"]}
+
+    async def save_stage_output(self, extraction_db_id: str, stage: str, output: dict):
+        """Checkpoint a completed pipeline stage (output stored zstd-compressed)."""
+        async with self.pool.acquire() as conn:
+            await conn.execute(
+                "INSERT INTO extraction_stages (extraction_id, stage, status, output_z) VALUES ($1::uuid, $2, 'done', $3) "
+                "ON CONFLICT (extraction_id, stage) DO UPDATE SET status = 'done', output_z = EXCLUDED.output_z, created_at = NOW()",
+                extraction_db_id, stage, compress_structured_data(output),
+            )
+
+    async def get_stage_output(self, extraction_db_id: str, stage: str) -> dict | None:
+        """Return a completed stage's checkpointed output, or None if it has not finished."""
+        async with self.pool.acquire() as conn:
+            payload = await conn.fetchval(
+                "SELECT output_z FROM extraction_stages WHERE extraction_id = $1::uuid AND stage = $2 AND status = 'done'",
+                extraction_db_id, stage,
+            )
+        return decompress_structured_data(payload) if payload is not None else None
+
+    async def clear_stage_outputs(self, extraction_db_id: str):
+        """Drop every stage checkpoint so the next run starts from scratch."""
+        async with self.pool.acquire() as conn:
+            await conn.execute("DELETE FROM extraction_stages WHERE extraction_id = $1::uuid", extraction_db_id)
+
     async def get_extraction_by_document(self, document_id: str):
         """Fetch the latest extraction for a document."""
         try:
@@ -63,18 +263,69 @@ class DatabaseClient:
             return None
 
     def log_audit(self, user_id: str, action: str, resource_type: str, resource_id: str, context: dict = None):
-        """Log an audit entry."""
+        """Queue an audit entry (non-blocking, flushed in batches)."""
+        self._audit_queue.put_nowait(
+            (user_id, action, resource_type, resource_id, json.dumps(context or {}, default=str))
+        )
+
+    # ─── Write-behind Flusher ────────────────────────────────────────────
+
+    @staticmethod
+    def _drain(queue: asyncio.Queue, batch: list) -> list:
+        """Pull queued rows without waiting, up to the row/byte caps."""
+        size = sum(len(item[-1] or "") for item in batch)
+        while len(batch) < MAX_BATCH_ROWS and size < MAX_BATCH_BYTES:
+            try:
+                item = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                break
+            batch.append(item)
+            size += len(item[-1] or "")
+        return batch
+
+    async def _flusher(self, queue: asyncio.Queue, writer):
+        """Collect queued rows and write them as one multi-row statement."""
+        while True:
+            try:
+                first = await asyncio.wait_for(queue.get(), timeout=FLUSH_INTERVAL_SECONDS)
+            except asyncio.TimeoutError:
+                continue
+            await self._write_batch(writer, self._drain(queue, [first]))
+
+    async def _write_batch(self, writer, batch: list):
         try:
-            audit_data = {
-                "user_id": user_id,
-                "action": action,
-                "resource_type": resource_type,
-                "resource_id": resource_id,
-                "context": context or {}
-            }
-            self.client.table("audit_logs").insert(audit_data).execute()
+            await writer(batch)
         except Exception as e:
-            logger.warning("Audit logging failed", error=str(e))
+            logger.warning("Batched write failed", writer=writer.__name__, rows=len(batch), error=str(e))
+
+    async def _write_audit_batch(self, batch: list):
+        user_ids, actions, resource_types, resource_ids, contexts = zip(*batch)
+        async with self.pool.acquire() as conn:
+            await conn.execute(
+                "INSERT INTO audit_logs (user_id, action, resource_type, resource_id, context) "
+                "SELECT u, a, rt, ri, c::jsonb FROM UNNEST($1::uuid[], $2::text[], $3::text[], $4::uuid[], $5::text[]) "
+                "AS t(u, a, rt, ri, c)",
+                user_ids, actions, resource_types, resource_ids, contexts,
+            )
+
+    async def _write_status_batch(self, batch: list):
+        # Coalesce by row id so only the latest status per extraction is written
+        latest = {row_id: (status, payload) for row_id, status, payload in batch}
+        ids = list(latest)
+        async with self.pool.acquire() as conn:
+            await conn.execute(
+                "UPDATE extractions AS e SET status = t.status, "
+                "structured_data = COALESCE(t.structured_data::jsonb, e.structured_data), "
+                # A new progress payload supersedes any previously stored compressed result
+                "structured_data_z = CASE WHEN t.structured_data IS NULL THEN e.structured_data_z END, "
+                "updated_at = NOW() "
+                "FROM UNNEST($1::uuid[], $2::text[], $3::text[]) AS t(id, status, structured_data) "
+                # Late-flushed progress must never overwrite a persisted result
+                "WHERE e.id = t.id AND e.status <> 'completed'",
+                ids, [latest[i][0] for i in ids], [latest[i][1] for i in ids],
+            )
+
 
-# Global instance
-db = DatabaseClient()
+def get_db(request: Request) -> DatabaseClient:
+    """FastAPI dependency returning the per-process client built in lifespan."""
+    return request.app.state.db
@@ -0,0 +1,9 @@
+-- Add content hash to documents so identical re-uploads can be short-circuited
+
+ALTER TABLE documents ADD COLUMN IF NOT EXISTS content_hash TEXT;
+
+CREATE INDEX IF NOT EXISTS idx_documents_content_hash ON documents(organization_id, content_hash);
+
+-- ROLLBACK
+-- DROP INDEX IF EXISTS idx_documents_content_hash;
+-- ALTER TABLE documents DROP COLUMN IF EXISTS content_hash;
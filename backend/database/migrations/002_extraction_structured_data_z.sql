@@ -0,0 +1,6 @@
+-- Store extraction results as zstd-compressed JSON instead of JSONB
+
+ALTER TABLE extractions ADD COLUMN IF NOT EXISTS structured_data_z BYTEA;
+
+-- ROLLBACK
+-- ALTER TABLE extractions DROP COLUMN IF EXISTS structured_data_z;
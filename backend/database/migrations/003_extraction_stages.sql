@@ -0,0 +1,13 @@
+-- Checkpoint each extraction pipeline stage so a restarted job resumes from the last completed one
+
+CREATE TABLE IF NOT EXISTS extraction_stages (
+    extraction_id UUID REFERENCES extractions(id) ON DELETE CASCADE,
+    stage TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'done',
+    output_z BYTEA NOT NULL,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    PRIMARY KEY (extraction_id, stage)
+);
+
+-- ROLLBACK
+-- DROP TABLE IF EXISTS extraction_stages;
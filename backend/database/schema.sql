@@ -9,6 +9,7 @@ CREATE TABLE IF NOT EXISTS documents (
     file_type TEXT NOT NULL,
     file_size_bytes BIGINT NOT NULL,
     storage_path TEXT NOT NULL, -- Path in Supabase Storage
+    content_hash TEXT, -- SHA-256 of file bytes, used to dedupe re-uploads
     document_type TEXT, -- 10-K, 10-Q, etc.
     company_name TEXT,
     fiscal_period TEXT,
@@ -25,7 +26,8 @@ CREATE TABLE IF NOT EXISTS extractions (
     status TEXT NOT NULL DEFAULT 'processing', -- processing, completed, failed
     quality_score FLOAT DEFAULT 0,
     selected_agent TEXT NOT NULL,
-    structured_data JSONB NOT NULL DEFAULT '{}', -- The full ExtractionResult object
+    structured_data JSONB NOT NULL DEFAULT '{}', -- In-progress stage/progress payload
+    structured_data_z BYTEA, -- zstd-compressed JSON of the full ExtractionResult object
     errors JSONB DEFAULT '[]',
     created_at TIMESTAMPTZ DEFAULT NOW(),
     updated_at TIMESTAMPTZ DEFAULT NOW()
@@ -42,7 +44,18 @@ CREATE TABLE IF NOT EXISTS audit_logs (
     timestamp TIMESTAMPTZ DEFAULT NOW()
 );
 
+-- 4. Extraction Stages: Per-stage checkpoints so a restarted pipeline resumes mid-way
+CREATE TABLE IF NOT EXISTS extraction_stages (
+    extraction_id UUID REFERENCES extractions(id) ON DELETE CASCADE,
+    stage TEXT NOT NULL, -- ocr, llm_extract, validate
+    status TEXT NOT NULL DEFAULT 'done',
+    output_z BYTEA NOT NULL, -- zstd-compressed JSON of the stage output
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    PRIMARY KEY (extraction_id, stage)
+);
+
 -- Indices for performance
 CREATE INDEX IF NOT EXISTS idx_documents_org ON documents(organization_id);
+CREATE INDEX IF NOT EXISTS idx_documents_content_hash ON documents(organization_id, content_hash);
 CREATE INDEX IF NOT EXISTS idx_extractions_doc ON extractions(document_id);
 CREATE INDEX IF NOT EXISTS idx_audit_log_resource ON audit_logs(resource_id);
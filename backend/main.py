@@ -8,13 +8,19 @@ import uuid
 from contextlib import asynccontextmanager
 
 import structlog
+from arq import create_pool
+from arq.connections import RedisSettings
 from dotenv import load_dotenv
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 
 from api.upload import router as upload_router
 from api.extract import router as extract_router
 from api.documents import router as documents_router
+from api.admin import router as admin_router
+from database.client import DatabaseClient
+from models.schemas import API_MODELS
 
 load_dotenv()
 
@@ -25,7 +31,18 @@ logger = structlog.get_logger()
 async def lifespan(app: FastAPI):
     """Application startup and shutdown events."""
     logger.info("Starting Finance AI SaaS Backend")
+    # Build validators/serializers now rather than on the first request
+    for model in API_MODELS:
+        model.model_rebuild()
+        _ = model.__pydantic_serializer__
+    app.state.db = await DatabaseClient.create()
+    # Job queue for the extraction workers (see workers/tasks.py)
+    app.state.arq = await create_pool(
+        RedisSettings.from_dsn(os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+    )
     yield
+    await app.state.arq.close()
+    await app.state.db.close()
     logger.info("Shutting down Finance AI SaaS Backend")
 
 
@@ -34,6 +51,7 @@ app = FastAPI(
     description="AI-powered financial document extraction and analysis",
     version="0.1.0",
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 # CORS — allow frontend to call backend
@@ -52,6 +70,7 @@ app.add_middleware(
 app.include_router(upload_router, prefix="/api", tags=["upload"])
 app.include_router(extract_router, prefix="/api", tags=["extraction"])
 app.include_router(documents_router, prefix="/api", tags=["documents"])
+app.include_router(admin_router, prefix="/api", tags=["admin"])
 
 
 @app.get("/health")
@@ -5,11 +5,11 @@ Pydantic data models — matching gemini.md schemas.
 from __future__ import annotations
 
 import uuid
-from datetime import datetime
+from datetime import datetime, timezone
 from enum import Enum
 from typing import Optional
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field, field_validator, model_validator
 
 
 # ─── Enums ───────────────────────────────────────────────────────────────────
@@ -49,6 +49,16 @@ class ProcessingStatus(str, Enum):
     NEEDS_REVIEW = "needs_review"
 
 
+class PipelineStage(str, Enum):
+    """Skippable extraction pipeline stages."""
+    OCR = "ocr"
+    TABLES = "tables"
+    NER = "ner"
+    NORMALIZATION = "normalization"
+    VALIDATION = "validation"
+    METRICS = "metrics"
+
+
 # ─── Input Models ────────────────────────────────────────────────────────────
 
 class DocumentMetadata(BaseModel):
@@ -66,7 +76,7 @@ class DocumentUpload(BaseModel):
     filename: str
     file_type: FileType
     file_size_bytes: int
-    upload_timestamp: datetime = Field(default_factory=datetime.utcnow)
+    upload_timestamp: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     document_type: Optional[DocumentType] = None
     metadata: DocumentMetadata = Field(default_factory=DocumentMetadata)
     status: ProcessingStatus = ProcessingStatus.PENDING
@@ -74,7 +84,18 @@ class DocumentUpload(BaseModel):
 
 # ─── Output Models ───────────────────────────────────────────────────────────
 
+# Immutable leaf models: no assignment validation, unknown keys dropped
+FROZEN_CONFIG = ConfigDict(
+    frozen=True,
+    extra="ignore",
+    validate_assignment=False,
+    arbitrary_types_allowed=False,
+    from_attributes=True,
+)
+
 class SourceCoordinates(BaseModel):
+    model_config = FROZEN_CONFIG
+
     x: float
     y: float
     w: float
@@ -82,19 +103,45 @@ class SourceCoordinates(BaseModel):
 
 
 class LineItem(BaseModel):
+    model_config = FROZEN_CONFIG
+
     label: str
     standardized_label: str
-    values: dict[str, Optional[float]]
+    values: list[Optional[float]]  # Aligned to the enclosing FinancialStatement.periods
     currency: str = "USD"
     confidence: float = Field(ge=0, le=1)
     source_page: Optional[int] = None
     source_coordinates: Optional[SourceCoordinates] = None
 
+    @field_validator("values", mode="before")
+    @classmethod
+    def _values_from_legacy_dict(cls, v):
+        """Accept the legacy {period: value} form, keeping period insertion order."""
+        if isinstance(v, dict):
+            return list(v.values())
+        return v
+
 
 class FinancialStatement(BaseModel):
+    model_config = FROZEN_CONFIG
+
     periods: list[str] = []
     line_items: list[LineItem] = []
 
+    @model_validator(mode="before")
+    @classmethod
+    def _align_legacy_values(cls, data):
+        """Align legacy {period: value} line item dicts to this statement's periods."""
+        if isinstance(data, dict) and data.get("periods"):
+            periods = data["periods"]
+            items = []
+            for item in data.get("line_items", []):
+                if isinstance(item, dict) and isinstance(item.get("values"), dict):
+                    item = {**item, "values": [item["values"].get(p) for p in periods]}
+                items.append(item)
+            data = {**data, "line_items": items}
+        return data
+
 
 class ValidationResults(BaseModel):
     balance_sheet_balanced: Optional[bool] = None
@@ -108,7 +155,7 @@ class ExtractionResult(BaseModel):
     """Complete extraction output — matches gemini.md output schema."""
     extraction_id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     document_id: str
-    extraction_timestamp: datetime = Field(default_factory=datetime.utcnow)
+    extraction_timestamp: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     document_type_detected: Optional[str] = None
     selected_agent: AgentType = AgentType.CLAUDE_SPECIALIST
     quality_score: float = Field(default=0, ge=0, le=100)
@@ -139,3 +186,14 @@ class DocumentListItem(BaseModel):
     upload_timestamp: datetime
     status: ProcessingStatus
     quality_score: Optional[float] = None
+
+
+# Models served on hot API paths, warmed at startup
+API_MODELS = (
+    LineItem,
+    FinancialStatement,
+    ValidationResults,
+    ExtractionResult,
+    UploadResponse,
+    DocumentListItem,
+)
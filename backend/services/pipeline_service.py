@@ -12,28 +12,120 @@ Stages:
 7. Metric Calculation (metric_calculator.py)
 """
 
+import asyncio
 import os
-import sys
+import time
+from contextlib import contextmanager
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Optional, Any
+from typing import Optional, Any, Iterable
 
+import numpy as np
 import structlog
 
-# Add parent and tools directories to path
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "tools"))
-
-from tools.ocr_extractor import extract_text_from_pdf
-from tools.table_extractor import extract_tables_from_pdf
+from tools.ocr_extractor import extract_text_from_pdf, DocumentExtraction, PageExtraction, TextBlock
+from tools.table_extractor import extract_tables_from_pdf, TableExtractionResult
 from tools.financial_spreader import spread_financial_data
 from tools.validation_engine import validate_extraction
 from tools.metric_calculator import calculate_metrics
-from backend.models.schemas import AgentType, ProcessingStatus
-from backend.database.client import db
+from models.schemas import AgentType, PipelineStage, ProcessingStatus
+from database.client import DatabaseClient
 
 logger = structlog.get_logger()
 
+# Small documents arriving within a short window share one Claude call (NER_BATCH_SIZE=1 disables)
+NER_BATCH_SIZE = int(os.getenv("NER_BATCH_SIZE", "4"))
+NER_BATCH_WINDOW_SECONDS = 0.05
+NER_BATCH_MAX_CHARS = 20000
+
+# In-flight Claude calls per process (single or batched); keeps bursts under the key's rate limit
+_claude_semaphore = asyncio.Semaphore(int(os.getenv("ANTHROPIC_MAX_CONCURRENCY", "5")))
+
+
+def _timed(fn, *args) -> tuple[Any, float]:
+    """Call fn and return (result, elapsed seconds)."""
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - started
+
+
+async def _skipped(result: Any) -> tuple[Any, float]:
+    """Stand-in for a skipped _timed stage."""
+    return result, 0.0
+
+
+class ClaudeBatcher:
+    """
+    Coalesces concurrent NER requests for small documents into batched Claude calls.
+
+    Requests are collected for up to NER_BATCH_WINDOW_SECONDS or until max_batch is reached,
+    then sent with analyze_financial_documents in a worker thread.
+    """
+
+    def __init__(self, max_batch: int = NER_BATCH_SIZE, window: float = NER_BATCH_WINDOW_SECONDS):
+        self.max_batch = max_batch
+        self.window = window
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._collector: Optional[asyncio.Task] = None
+        self._flushes: set[asyncio.Task] = set()
+
+    async def submit(self, doc_text: str, table_data: Any) -> dict:
+        """Queue one document and wait for its NER result."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Bind to the running loop (a worker keeps one; the CLI creates a fresh one)
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._collector = loop.create_task(self._collect())
+
+        future = loop.create_future()
+        self._queue.put_nowait((doc_text, table_data, future))
+        return await future
+
+    async def _collect(self):
+        while True:
+            batch = [await self._queue.get()]
+            deadline = self._loop.time() + self.window
+            while len(batch) < self.max_batch:
+                timeout = deadline - self._loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            # Flush in the background so the next batch can start collecting
+            task = self._loop.create_task(self._flush(batch))
+            self._flushes.add(task)
+            task.add_done_callback(self._flushes.discard)
+
+    async def _flush(self, batch: list):
+        from tools.financial_ner import analyze_financial_documents
+
+        try:
+            async with _claude_semaphore:
+                results = await asyncio.to_thread(
+                    analyze_financial_documents,
+                    [(doc_text, table_data) for doc_text, table_data, _ in batch],
+                    api_key=os.getenv("ANTHROPIC_API_KEY"),
+                )
+        except Exception as e:
+            for *_, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        logger.info("Batched NER call complete", documents=len(batch))
+        for (*_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+
+_ner_batcher = ClaudeBatcher()
+
+
 @dataclass
 class PipelineStatus:
     document_id: str
@@ -43,17 +135,21 @@ class PipelineStatus:
     end_time: Optional[datetime] = None
     errors: list[str] = field(default_factory=list)
     results: dict[str, Any] = field(default_factory=dict)
+    stage_durations_ms: dict[str, float] = field(default_factory=dict)
 
 class ExtractionPipelineService:
     """
     Orchestrates the 7-stage financial extraction pipeline.
     """
 
-    def __init__(self, document_id: str, file_path: str, agent_type: AgentType = AgentType.CLAUDE_SPECIALIST, extraction_db_id: str = None):
+    def __init__(self, document_id: str, file_path: str, agent_type: AgentType = AgentType.CLAUDE_SPECIALIST, extraction_db_id: str = None, db: Optional[DatabaseClient] = None, stages: Optional[Iterable[str]] = None):
         self.status = PipelineStatus(document_id=document_id)
         self.file_path = file_path
         self.agent_type = agent_type
         self.extraction_db_id = extraction_db_id
+        self.db = db
+        # Stages to run (PipelineStage values); anything left out is skipped
+        self.stages = frozenset(PipelineStage(stage).value for stage in (stages or PipelineStage))
         self.results = {}
 
     async def run(self) -> PipelineStatus:
@@ -63,63 +159,13 @@ class ExtractionPipelineService:
         logger.info("Starting extraction pipeline", document_id=self.status.document_id, file=self.file_path)
 
         try:
-            # Stage 2: OCR & Text Extraction
-            self._update_stage("ocr", 15)
-            doc_extraction = extract_text_from_pdf(self.file_path)
-            if doc_extraction.errors:
-                self.status.errors.extend(doc_extraction.errors)
-            self.results["text_extraction"] = doc_extraction
-            logger.info("Stage 2 Complete: OCR & Text", pages=doc_extraction.total_pages)
-
-            # Stage 3: Table Extraction
-            self._update_stage("tables", 30)
-            table_results = extract_tables_from_pdf(self.file_path)
-            if table_results.errors:
-                self.status.errors.extend(table_results.errors)
-            self.results["table_extraction"] = table_results
-            logger.info("Stage 3 Complete: Tables", tables=len(table_results.tables))
-
-            # Stage 4: Financial NER (Multi-Agent Routing)
-            self._update_stage("ner", 50)
-            ner_results = await self._run_agent_analysis(doc_extraction, table_results)
-            self.results["ner"] = ner_results
-            
-            # Combine NER insights with deterministic spreader
-            labels, values_by_period = self._merge_ner_and_table_data(ner_results, table_results)
-            logger.info("Stage 4 Complete: NER", agent=self.agent_type)
-
-            # Stage 5: Normalization
-            self._update_stage("normalization", 70)
-            spread_result = spread_financial_data(labels, values_by_period)
-            self.results["normalization"] = spread_result
-            logger.info("Stage 5 Complete: Normalization", mapped_items=len(spread_result.income_statement) + len(spread_result.balance_sheet))
-
-            # Prepare statements for validation and metrics
-            statements = self._prepare_statements_dict(spread_result)
-            periods = spread_result.periods
-
-            # Stage 6: Validation
-            self._update_stage("validation", 85)
-            validation_result = validate_extraction(statements, periods)
-            self.results["validation"] = validation_result
-            logger.info("Stage 6 Complete: Validation", quality_score=validation_result.quality_score)
-
-            # Stage 7: Metrics
-            self._update_stage("metrics", 95)
-            metrics = calculate_metrics(statements, periods)
-            self.results["metrics"] = metrics
-            logger.info("Stage 7 Complete: Metrics", metrics_count=len(metrics))
+            ocr_state = await self.run_ocr()
+            llm_state = await self.run_llm_extract(ocr_state)
+            self.status.results = self.run_validate(llm_state)
 
             # Finalize
             self._update_stage("complete", 100)
             self.status.end_time = datetime.now()
-            self.status.results = {
-                "document_type": ner_results.get("document_type"),
-                "quality_score": validation_result.quality_score,
-                "periods": periods,
-                "metrics": metrics,
-                "statements": statements
-            }
 
         except Exception as e:
             error_msg = f"Pipeline failed: {str(e)}"
@@ -130,20 +176,120 @@ class ExtractionPipelineService:
 
         return self.status
 
+    # ─── Stages ──────────────────────────────────────────────────────────
+    # Each stage takes the previous stage's output, so the worker can checkpoint
+    # between them and resume from the last completed one.
+
+    async def run_ocr(self) -> dict:
+        """Stages 2–3: text and table extraction (CPU-bound), run concurrently in threads."""
+        # Stages 2 & 3 read the same PDF independently, so they overlap in one span
+        with self._stage("ocr", 30) as span:
+            (doc_extraction, ocr_seconds), (table_results, table_seconds) = await asyncio.gather(
+                asyncio.to_thread(_timed, extract_text_from_pdf, self.file_path)
+                if "ocr" in self.stages else _skipped(DocumentExtraction(file_path=self.file_path)),
+                asyncio.to_thread(_timed, extract_tables_from_pdf, self.file_path)
+                if "tables" in self.stages else _skipped(TableExtractionResult(file_path=self.file_path)),
+            )
+
+            # Shared state is only touched back on the event loop
+            if doc_extraction.errors:
+                self.status.errors.extend(doc_extraction.errors)
+            if table_results.errors:
+                self.status.errors.extend(table_results.errors)
+            self.results["text_extraction"] = doc_extraction
+            self.results["table_extraction"] = table_results
+            span.update(
+                pages=doc_extraction.total_pages,
+                tables=len(table_results.tables),
+                text_ms=round(ocr_seconds * 1000, 1),
+                tables_ms=round(table_seconds * 1000, 1),
+            )
+
+        return {"text_extraction": doc_extraction, "table_extraction": table_results}
+
+    async def run_llm_extract(self, ocr_state: dict) -> dict:
+        """Stages 4–5: agent analysis and normalization (I/O-bound on the LLM API)."""
+        doc_extraction = ocr_state["text_extraction"]
+        table_results = ocr_state["table_extraction"]
+
+        # Stage 4: Financial NER (Multi-Agent Routing)
+        if "ner" in self.stages:
+            with self._stage("ner", 50) as span:
+                ner_results = await self._run_agent_analysis(doc_extraction, table_results)
+                self.results["ner"] = ner_results
+                span.update(agent=self.agent_type)
+        else:
+            # No table hints — the merge below falls back to every extracted table
+            ner_results = {"document_type": "Unknown"}
+
+        # Stage 5: Normalization (NER insights combined with the deterministic spreader)
+        periods, statements = [], {}
+        if "normalization" in self.stages:
+            with self._stage("normalization", 70) as span:
+                labels, values_by_period = self._merge_ner_and_table_data(ner_results, table_results)
+                spread_result = spread_financial_data(labels, values_by_period)
+                self.results["normalization"] = spread_result
+                periods, statements = spread_result.periods, spread_result.statements
+                span.update(mapped_items=len(statements))
+
+        return {
+            "document_type": ner_results.get("document_type"),
+            "periods": periods,
+            "statements": statements,
+        }
+
+    def run_validate(self, llm_state: dict) -> dict:
+        """Stages 6–7: validation and metrics. Returns the final pipeline results."""
+        statements = llm_state["statements"]
+        periods = llm_state["periods"]
+
+        # Stage 6: Validation
+        quality_score = 0
+        if "validation" in self.stages:
+            with self._stage("validation", 85) as span:
+                validation_result = validate_extraction(statements, periods)
+                self.results["validation"] = validation_result
+                quality_score = validation_result.quality_score
+                span.update(quality_score=quality_score)
+
+        # Stage 7: Metrics
+        metrics = {}
+        if "metrics" in self.stages:
+            with self._stage("metrics", 95) as span:
+                metrics = calculate_metrics(statements, periods)
+                self.results["metrics"] = metrics
+                span.update(metrics_count=len(metrics))
+
+        return {
+            "document_type": llm_state.get("document_type"),
+            "quality_score": quality_score,
+            "periods": periods,
+            "metrics": metrics,
+            "statements": statements
+        }
+
+    @contextmanager
+    def _stage(self, stage: str, progress: int):
+        """Enter a stage and emit one timed stage_done log; yields a dict for extra log fields."""
+        self._update_stage(stage, progress)
+        span: dict[str, Any] = {}
+        started = time.perf_counter()
+        yield span
+        duration_ms = round((time.perf_counter() - started) * 1000, 1)
+        self.status.stage_durations_ms[stage] = duration_ms
+        logger.info("stage_done", stage=stage, duration_ms=duration_ms, **span)
+
     def _update_stage(self, stage: str, progress: int):
         self.status.stage = stage
         self.status.progress = progress
-        logger.info("Pipeline Step", stage=stage, progress=f"{progress}%")
-        
-        # Async DB update (fire and forget for now, or could be awaited if run() is async)
-        if self.extraction_db_id:
-            try:
-                db.client.table("extractions").update({
-                    "status": "processing",
-                    "structured_data": {"current_stage": stage, "progress": progress}
-                }).eq("id", self.extraction_db_id).execute()
-            except Exception as e:
-                logger.warning("Failed to update status in DB", error=str(e))
+
+        # Non-blocking: the DB client's write-behind flusher batches and coalesces these
+        if self.extraction_db_id and self.db:
+            self.db.queue_status_update(
+                self.extraction_db_id,
+                "processing",
+                {"current_stage": stage, "progress": progress},
+            )
 
     async def _run_agent_analysis(self, doc_ext: Any, table_res: Any) -> dict:
         """
@@ -170,20 +316,25 @@ class ExtractionPipelineService:
         if hasattr(doc_ext, "text"):
             doc_text = doc_ext.text
         elif hasattr(doc_ext, "pages"):
-            doc_text = "\n".join([p.text for p in doc_ext.pages])
+            # Form feeds mark page boundaries for the NER prompt windowing
+            doc_text = "\f".join(p.full_text for p in doc_ext.pages)
         else:
             doc_text = str(doc_ext)
 
         # Execute analysis
-        # Note: In a real async environment, we might want to run this in a thread pool 
-        # if the library is blocking, but for now we call it directly.
-        # analyze_financial_document is synchronous in our implementation.
+        # analyze_financial_document is synchronous, so it runs in a worker thread
+        # to keep the event loop free for other pipelines and status flushes.
         try:
-            return analyze_financial_document(
-                doc_text=doc_text,
-                table_data=table_res,
-                api_key=os.getenv("ANTHROPIC_API_KEY")
-            )
+            if NER_BATCH_SIZE > 1 and len(doc_text) <= NER_BATCH_MAX_CHARS:
+                return await _ner_batcher.submit(doc_text, table_res)
+            # Slot is held only for the API call, not the merge/normalization that follows
+            async with _claude_semaphore:
+                return await asyncio.to_thread(
+                    analyze_financial_document,
+                    doc_text=doc_text,
+                    table_data=table_res,
+                    api_key=os.getenv("ANTHROPIC_API_KEY")
+                )
         except Exception as e:
             logger.error(f"Financial NER failed: {e}")
             return {
@@ -219,10 +370,10 @@ class ExtractionPipelineService:
             "confidence": 0.97
         }
 
-    def _merge_ner_and_table_data(self, ner: dict, tables: Any) -> tuple[list[str], dict[str, list[float]]]:
-        """Merge Claude's structural insights with raw table data."""
+    def _merge_ner_and_table_data(self, ner: dict, tables: Any) -> tuple[list[str], dict[str, np.ndarray]]:
+        """Merge Claude's structural insights with raw table data (missing values are NaN)."""
         labels = []
-        values_by_period = {}
+        columns: dict[str, list[np.ndarray]] = {}
         
         # If NER identified specific tables, we prioritize them
         table_indices = [ner.get("is_table_index"), ner.get("bs_table_index"), ner.get("cf_table_index")]
@@ -234,52 +385,64 @@ class ExtractionPipelineService:
             
         for table in target_tables:
             if not table.headers: continue
-            
+
             # Detect periods (usually columns 1+)
             periods = table.headers[1:]
-            for p in periods:
-                if p not in values_by_period: values_by_period[p] = []
-            
-            for i, row in enumerate(table.rows):
-                labels.append(row[0])
-                num_row = table.numeric_rows[i]
-                for j, p in enumerate(periods):
-                    val = num_row[j+1] if (j+1) < len(num_row) else None
-                    values_by_period[p].append(val)
-                    
+            # One numeric row per label row (missing rows and columns contribute NaN)
+            n_rows = len(table.rows)
+            data = table.numeric_data[:n_rows]
+            labels.extend(row[0] for row in table.rows)
+
+            # Each period is a column slice of the table's float64 array
+            for j, p in enumerate(periods, start=1):
+                column = np.full(n_rows, np.nan)
+                if j < data.shape[1]:
+                    column[:len(data)] = data[:, j]
+                columns.setdefault(p, []).append(column)
+
+        values_by_period = {p: np.concatenate(chunks) for p, chunks in columns.items()}
+
         return labels, values_by_period
 
-    def _prepare_statements_dict(self, spread_result):
-        """Prepare standardized_label -> {period: value} dict."""
-        statements = {}
-        
-        all_items = (
-            spread_result.income_statement + 
-            spread_result.balance_sheet + 
-            spread_result.cash_flow
-        )
-        
-        for item in all_items:
-            statements[item.standardized_label] = item.values
-            
-        return statements
+
+def restore_ocr_state(state: dict) -> dict:
+    """Rebuild the OCR stage output from its checkpointed (plain dict) form."""
+    text = state["text_extraction"]
+    return {
+        "text_extraction": DocumentExtraction(
+            file_path=text["file_path"],
+            total_pages=text["total_pages"],
+            pages=[
+                PageExtraction(**{**page, "blocks": [TextBlock(**b) for b in page["blocks"]]})
+                for page in text["pages"]
+            ],
+            errors=text["errors"],
+        ),
+        "table_extraction": TableExtractionResult.from_dict(state["table_extraction"]),
+    }
 
 if __name__ == "__main__":
-    import asyncio
-    
+    import argparse
+
     async def test():
-        if len(sys.argv) < 2:
-            print("Usage: python pipeline_service.py <pdf_path>")
-            return
-            
-        service = ExtractionPipelineService("test-id", sys.argv[1])
+        parser = argparse.ArgumentParser(description="Run the extraction pipeline on a PDF.")
+        parser.add_argument("pdf_path")
+        parser.add_argument(
+            "--stages",
+            default=",".join(stage.value for stage in PipelineStage),
+            help="Comma-separated stages to run (e.g. ocr,tables,normalization)",
+        )
+        args = parser.parse_args()
+
+        service = ExtractionPipelineService("test-id", args.pdf_path, stages=args.stages.split(","))
         status = await service.run()
         print("\nPipeline Result:")
         print(f"Stage: {status.stage}")
         print(f"Errors: {status.errors}")
+        print(f"Stage durations (ms): {status.stage_durations_ms}")
         if status.stage == "complete":
             print(f"Quality Score: {status.results['quality_score']}")
             print(f"Periods: {status.results['periods']}")
             print(f"Metrics: {list(status.results['metrics'].keys())}")
-            
+
     asyncio.run(test())
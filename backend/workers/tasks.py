@@ -0,0 +1,194 @@
+"""
+Extraction Workers — ARQ task definitions.
+Runs the extraction pipeline outside the API process, one job per stage.
+
+Start a worker with:
+    arq workers.tasks.WorkerSettings
+"""
+
+import os
+from functools import lru_cache
+from typing import Optional
+
+import structlog
+from arq.connections import RedisSettings
+from arq.constants import default_queue_name
+from dotenv import load_dotenv
+
+from models.schemas import ExtractionResult, ProcessingStatus, FinancialStatement, LineItem, ValidationResults, AgentType
+from services.pipeline_service import ExtractionPipelineService, restore_ocr_state
+from database.client import DatabaseClient
+from tools.financial_spreader import INCOME_STATEMENT_MAPPINGS, BALANCE_SHEET_MAPPINGS, CASH_FLOW_MAPPINGS
+from tools.process_pool import shutdown_pool
+
+load_dotenv()
+
+logger = structlog.get_logger()
+
+# Pipelines allowed to run concurrently on one worker process; excess jobs wait in Redis.
+# Their OCR and Camelot work all shares one PROCESS_WORKERS-sized pool (tools.process_pool)
+MAX_INFLIGHT_EXTRACTIONS = int(os.getenv("MAX_INFLIGHT_EXTRACTIONS", "4"))
+
+# Standardized label → ExtractionResult statement key, derived once from the spreader taxonomy
+_LABEL_TO_STATEMENT: dict[str, str] = {
+    **{label: "income_statement" for label in INCOME_STATEMENT_MAPPINGS.values()},
+    **{label: "balance_sheet" for label in BALANCE_SHEET_MAPPINGS.values()},
+    **{label: "cash_flow_statement" for label in CASH_FLOW_MAPPINGS.values()},
+}
+
+
+@lru_cache(maxsize=4096)
+def _display_label(label: str) -> str:
+    return label.replace("_", " ").title()
+
+
+# ─── Pipeline Stages ──────────────────────────────────────────────────────
+# Each stage is its own job: it checkpoints its output to extraction_stages and
+# enqueues the next stage, so a crashed worker resumes from the last completed stage.
+# Stages can be routed to separate queues (e.g. OCR_QUEUE) and served by pools sized
+# to their bottleneck; by default every stage shares the default queue.
+
+STAGES = ("ocr", "llm_extract", "validate", "persist")
+STAGE_QUEUES = {stage: os.getenv(f"{stage.upper()}_QUEUE", default_queue_name) for stage in STAGES}
+
+
+def _pipeline_service(ctx: dict, document_id: str, file_path: str, agent_type: AgentType, extraction_db_id: str, stages: Optional[list[str]]) -> ExtractionPipelineService:
+    return ExtractionPipelineService(document_id, file_path, agent_type=agent_type, extraction_db_id=extraction_db_id, db=ctx["db"], stages=stages)
+
+
+async def _enqueue_stage(ctx: dict, stage: str, document_id: str, file_path: str, agent_type: AgentType, extraction_db_id: str, stages: Optional[list[str]], run_id: Optional[str]):
+    # Job ids are per run: ARQ silently drops an enqueue whose id (or kept result) still exists,
+    # which would stall a re-run of the same extraction at its first colliding stage
+    await ctx["redis"].enqueue_job(
+        f"{stage}_stage",
+        document_id, file_path, agent_type, extraction_db_id, stages, run_id,
+        _job_id=f"{extraction_db_id}:{run_id}:{stage}",
+        _queue_name=STAGE_QUEUES[stage],
+    )
+
+
+async def _run_stage(ctx: dict, stage: str, document_id: str, file_path: str, agent_type: AgentType, extraction_db_id: str, stages: Optional[list[str]], run_id: Optional[str], work):
+    """Run one stage unless already checkpointed, then hand off to the next."""
+    db = ctx["db"]
+    logger.info(
+        "Extraction stage started",
+        document_id=document_id,
+        stage=stage,
+        queue_depth=await ctx["redis"].zcard(STAGE_QUEUES[stage]),
+        max_inflight=MAX_INFLIGHT_EXTRACTIONS,
+    )
+    try:
+        if await db.get_stage_output(extraction_db_id, stage) is None:
+            output = await work(_pipeline_service(ctx, document_id, file_path, agent_type, extraction_db_id, stages))
+            if output is not None:
+                await db.save_stage_output(extraction_db_id, stage, output)
+        else:
+            logger.info("Stage already complete, resuming", document_id=document_id, stage=stage)
+
+        next_index = STAGES.index(stage) + 1
+        if next_index < len(STAGES):
+            await _enqueue_stage(ctx, STAGES[next_index], document_id, file_path, agent_type, extraction_db_id, stages, run_id)
+
+    except Exception as e:
+        logger.error("Error in background pipeline", document_id=document_id, stage=stage, error=str(e))
+        db.queue_status_update(extraction_db_id, "failed")
+
+
+async def run_extraction_pipeline(ctx: dict, document_id: str, file_path: str, agent_type: AgentType = AgentType.CLAUDE_SPECIALIST, extraction_db_id: str = None, stages: Optional[list[str]] = None, run_id: Optional[str] = None):
+    """Queued entry job: start the stage chain at the first stage."""
+    await _enqueue_stage(ctx, STAGES[0], document_id, file_path, agent_type, extraction_db_id, stages, run_id)
+
+
+async def ocr_stage(ctx: dict, document_id: str, file_path: str, agent_type: AgentType, extraction_db_id: str, stages: Optional[list[str]] = None, run_id: Optional[str] = None):
+    async def work(service: ExtractionPipelineService) -> dict:
+        return await service.run_ocr()
+
+    await _run_stage(ctx, "ocr", document_id, file_path, agent_type, extraction_db_id, stages, run_id, work)
+
+
+async def llm_extract_stage(ctx: dict, document_id: str, file_path: str, agent_type: AgentType, extraction_db_id: str, stages: Optional[list[str]] = None, run_id: Optional[str] = None):
+    async def work(service: ExtractionPipelineService) -> dict:
+        ocr_state = await ctx["db"].get_stage_output(extraction_db_id, "ocr")
+        return await service.run_llm_extract(restore_ocr_state(ocr_state))
+
+    await _run_stage(ctx, "llm_extract", document_id, file_path, agent_type, extraction_db_id, stages, run_id, work)
+
+
+async def validate_stage(ctx: dict, document_id: str, file_path: str, agent_type: AgentType, extraction_db_id: str, stages: Optional[list[str]] = None, run_id: Optional[str] = None):
+    async def work(service: ExtractionPipelineService) -> dict:
+        llm_state = await ctx["db"].get_stage_output(extraction_db_id, "llm_extract")
+        return service.run_validate(llm_state)
+
+    await _run_stage(ctx, "validate", document_id, file_path, agent_type, extraction_db_id, stages, run_id, work)
+
+
+async def persist_stage(ctx: dict, document_id: str, file_path: str, agent_type: AgentType, extraction_db_id: str, stages: Optional[list[str]] = None, run_id: Optional[str] = None):
+    async def work(service: ExtractionPipelineService) -> None:
+        # Map pipeline results back to the Pydantic model
+        db = ctx["db"]
+        results = await db.get_stage_output(extraction_db_id, "validate")
+        statements_data = results.get("statements", {})
+
+        # Bucket line items by statement in a single pass
+        periods = results.get("periods", [])
+        buckets = {"income_statement": [], "balance_sheet": [], "cash_flow_statement": []}
+        for label, values in statements_data.items():
+            statement = _LABEL_TO_STATEMENT.get(label, "income_statement")
+            buckets[statement].append(LineItem(
+                label=_display_label(label),
+                standardized_label=label,
+                values=[values.get(p) for p in periods],
+                confidence=0.9
+            ))
+
+        final_result = ExtractionResult(
+            document_id=document_id,
+            status=ProcessingStatus.COMPLETED,
+            quality_score=results.get("quality_score", 0),
+            statements={
+                statement: FinancialStatement(periods=periods, line_items=line_items)
+                for statement, line_items in buckets.items()
+            },
+            calculated_metrics=results.get("metrics", {}),
+            selected_agent=agent_type,
+            validation=ValidationResults(
+                quality_score=results.get("quality_score", 0),
+            )
+        )
+        # Update the row created at trigger time by id; an extraction_id would route this through
+        # the INSERT upsert, which fails NOT NULL on selected_agent before ON CONFLICT is reached
+        await db.save_extraction({
+            "id": extraction_db_id,
+            "status": "completed",
+            "quality_score": results.get("quality_score", 0),
+            "structured_data": final_result.model_dump()
+        })
+        # Checkpoints only matter while a run is in flight (the API also clears them when a
+        # run is triggered, so a failed run's leftovers never leak into the next one)
+        await db.clear_stage_outputs(extraction_db_id)
+        logger.info("Background extraction complete", document_id=document_id)
+
+    await _run_stage(ctx, "persist", document_id, file_path, agent_type, extraction_db_id, stages, run_id, work)
+
+
+async def startup(ctx: dict):
+    """Share one database client across every job on this worker."""
+    ctx["db"] = await DatabaseClient.create()
+    logger.info("Extraction worker started")
+
+
+async def shutdown(ctx: dict):
+    await ctx["db"].close()
+    shutdown_pool()
+    logger.info("Extraction worker stopped")
+
+
+class WorkerSettings:
+    """ARQ worker configuration."""
+    functions = [run_extraction_pipeline, ocr_stage, llm_extract_stage, validate_stage, persist_stage]
+    on_startup = startup
+    on_shutdown = shutdown
+    max_jobs = MAX_INFLIGHT_EXTRACTIONS
+    # Set WORKER_QUEUE to dedicate this worker pool to one stage's queue
+    queue_name = os.getenv("WORKER_QUEUE", default_queue_name)
+    redis_settings = RedisSettings.from_dsn(os.getenv("REDIS_URL", "redis://localhost:6379/0"))
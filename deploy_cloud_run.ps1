@@ -11,6 +11,17 @@ if (-not $PROJECT_ID) {
 
 Write-Host "Deploying to Project: $PROJECT_ID"
 
+# Extraction runs as ARQ jobs, so the API and the worker need the same Redis and Postgres.
+# Cloud Run has no bundled Redis: point REDIS_URL at a Memorystore instance reachable through
+# the VPC connector named in VPC_CONNECTOR.
+$REDIS_URL = $env:REDIS_URL
+$SUPABASE_DB_URL = $env:SUPABASE_DB_URL
+$VPC_CONNECTOR = $env:VPC_CONNECTOR
+if (-not $REDIS_URL -or -not $SUPABASE_DB_URL -or -not $VPC_CONNECTOR) {
+    Write-Error "Set REDIS_URL, SUPABASE_DB_URL and VPC_CONNECTOR before deploying."
+}
+$BACKEND_ENV = "REDIS_URL=$REDIS_URL,SUPABASE_DB_URL=$SUPABASE_DB_URL"
+
 # 1. Enable Services
 Write-Host "Enabling necessary Google Cloud services..."
 gcloud services enable cloudbuild.googleapis.com run.googleapis.com containerregistry.googleapis.com
@@ -26,7 +37,8 @@ gcloud run deploy finance-ai-backend `
     --platform managed `
     --region us-central1 `
     --allow-unauthenticated `
-    --set-env-vars "FRONTEND_URL=https://finance-ai-frontend-uc.a.run.app" 
+    --vpc-connector $VPC_CONNECTOR `
+    --set-env-vars "$BACKEND_ENV,FRONTEND_URL=https://finance-ai-frontend-uc.a.run.app"
     # Note: FRONTEND_URL is set tentatively; we might need to update it after frontend deploy if URL changes, 
     # but initially we can't know it. We can redeploy backend later or just use "*" for CORS in dev/mvp.
 
@@ -35,7 +47,19 @@ $BACKEND_URL_RAW = gcloud run services describe finance-ai-backend --platform ma
 $BACKEND_URL = $BACKEND_URL_RAW.Trim()
 Write-Host "Backend deployed at: $BACKEND_URL"
 
-# 4. Deploy Frontend
+# 4. Deploy Extraction Worker
+# Same image as the API, running the ARQ worker instead of uvicorn. A worker pool has no HTTP
+# endpoint and is never scaled to zero, so queued extractions are always picked up.
+Write-Host "Deploying Extraction Worker..."
+gcloud beta run worker-pools deploy finance-ai-worker `
+    --image gcr.io/$PROJECT_ID/finance-ai-backend `
+    --region us-central1 `
+    --vpc-connector $VPC_CONNECTOR `
+    --command arq `
+    --args workers.tasks.WorkerSettings `
+    --set-env-vars $BACKEND_ENV
+
+# 5. Deploy Frontend
 Write-Host "Deploying Frontend..."
 gcloud run deploy finance-ai-frontend `
     --image gcr.io/$PROJECT_ID/finance-ai-frontend `
@@ -51,15 +75,16 @@ Write-Host "--------------------------------------------------"
 Write-Host "Deployment Complete!"
 Write-Host "Frontend: $FRONTEND_URL"
 Write-Host "Backend:  $BACKEND_URL"
+Write-Host "Worker:   finance-ai-worker (worker pool)"
 Write-Host "--------------------------------------------------"
 
-# 5. Update Backend with correct Frontend URL for CORS (Optional but recommended)
+# 6. Update Backend with correct Frontend URL for CORS (Optional but recommended)
 Write-Host "Updating Backend CORS with actual Frontend URL..."
 gcloud run deploy finance-ai-backend `
     --image gcr.io/$PROJECT_ID/finance-ai-backend `
     --platform managed `
     --region us-central1 `
-    --set-env-vars "FRONTEND_URL=$FRONTEND_URL" `
+    --update-env-vars "FRONTEND_URL=$FRONTEND_URL" `
     --quiet
 
 Write-Host "Backend updated with Frontend URL."
@@ -5,14 +5,36 @@ Uses Anthropic Claude Opus 4.6 to identify financial line items, periods, and cu
 """
 
 import os
+import re
 import json
+import hashlib
+import functools
+import httpx
 import structlog
 from typing import Any, Dict, List, Optional
 from anthropic import Anthropic
-from pydantic import BaseModel, Field
+import redis
+from pydantic import BaseModel, Field, ValidationError
 
 logger = structlog.get_logger()
 
+NER_MODEL = "claude-3-opus-20240229"
+
+# Parsed Claude responses are cached in Redis (when REDIS_URL is set) keyed on the exact prompt inputs
+NER_CACHE_TTL_SECONDS = 30 * 24 * 60 * 60
+NER_CACHE_PREFIX = "finner:"
+
+# Character budgets for the document text and serialized tables in the prompt
+TEXT_PROMPT_BUDGET = 100000
+TABLE_PROMPT_BUDGET = 48000
+
+# Pages are separated by form feeds; pages matching these phrases are kept first when text is over budget
+PAGE_SEPARATOR = "\f"
+FINANCIAL_PAGE_PATTERN = re.compile(
+    r"(consolidated (balance sheets?|statements? of (operations|cash flows|income))|total assets|net (income|revenue))",
+    re.IGNORECASE,
+)
+
 # ─── Data Models ─────────────────────────────────────────────────────────────
 
 class FinancialLineItem(BaseModel):
@@ -32,6 +54,22 @@ class ExtractionResult(BaseModel):
     agent_notes: str
     confidence: float
 
+class BatchExtractionResult(BaseModel):
+    documents: List[ExtractionResult]
+
+# Forced tool call so Claude returns ExtractionResult-shaped JSON directly
+EMIT_FINANCIALS_TOOL = {
+    "name": "emit_financials",
+    "description": "Record the structured financial data extracted from the document.",
+    "input_schema": ExtractionResult.model_json_schema(),
+}
+
+EMIT_FINANCIALS_BATCH_TOOL = {
+    "name": "emit_financials_batch",
+    "description": "Record the structured financial data for every document, one entry per document in order.",
+    "input_schema": BatchExtractionResult.model_json_schema(),
+}
+
 # ─── Prompts ─────────────────────────────────────────────────────────────────
 
 SYSTEM_PROMPT = """You are a senior financial analyst and accounting expert. Your task is to extract structured financial data from OCR text and tables.
@@ -60,9 +98,153 @@ Here is the extracted text and table data from a financial document.
 {table_content}
 
 --- INSTRUCTIONS ---
-Extract the financial data into the specified JSON format.
+Extract the financial data and record it with the emit_financials tool.
 """
 
+BATCH_DOCUMENT_TEMPLATE = """
+=== DOCUMENT {index} ===
+
+--- TEXT CONTENT ---
+{text_content}
+
+--- TABLE DATA ---
+{table_content}
+"""
+
+BATCH_INSTRUCTIONS = """
+--- INSTRUCTIONS ---
+The {count} documents above are unrelated. Extract the financial data of each one separately and
+record all of them with a single emit_financials_batch call, one entry per document in the order given.
+"""
+
+def _split_template(template: str, *fields: str) -> tuple[str, ...]:
+    """Split a format template into the literal segments around the given fields (in order)."""
+    segments = []
+    rest = template
+    for name in fields:
+        head, rest = rest.split("{" + name + "}", 1)
+        segments.append(head)
+    segments.append(rest)
+    return tuple(segments)
+
+# Pre-split once so hot-path prompts are plain concatenation, not str.format parsing
+_PROMPT_PREFIX, _PROMPT_MID, _PROMPT_SUFFIX = _split_template(
+    USER_PROMPT_TEMPLATE, "text_content", "table_content"
+)
+_BATCH_DOC_PREFIX, _BATCH_DOC_TEXT, _BATCH_DOC_TABLES, _BATCH_DOC_SUFFIX = _split_template(
+    BATCH_DOCUMENT_TEMPLATE, "index", "text_content", "table_content"
+)
+
+# ─── Text Windowing ──────────────────────────────────────────────────────────
+
+def _select_financial_pages(doc_text: str, budget: int = TEXT_PROMPT_BUDGET) -> str:
+    """
+    Fit the document text into the budget, keeping the pages most likely to hold statements.
+
+    Pages are ranked by financial keyword hits and added greedily until the budget is spent,
+    then emitted in their original order.
+    """
+    if len(doc_text) <= budget:
+        return doc_text
+
+    pages = doc_text.split(PAGE_SEPARATOR)
+    ranked = sorted(
+        range(len(pages)),
+        key=lambda i: len(FINANCIAL_PAGE_PATTERN.findall(pages[i])),
+        reverse=True,
+    )
+
+    selected = []
+    used = 0
+    for i in ranked:
+        cost = len(pages[i]) + len(PAGE_SEPARATOR)
+        if used + cost > budget:
+            continue
+        selected.append(i)
+        used += cost
+
+    if not selected:
+        # A single page larger than the whole budget
+        return pages[ranked[0]][:budget]
+    return PAGE_SEPARATOR.join(pages[i] for i in sorted(selected))
+
+# ─── Table Serialization ─────────────────────────────────────────────────────
+
+def _serialize_tables_for_prompt(table_data: Any, budget: int = TABLE_PROMPT_BUDGET) -> str:
+    """
+    Compact JSON for the prompt: headers + raw rows per table (numeric_data is
+    recoverable from rows). Tables are added whole until the budget is reached,
+    so the output is always valid JSON.
+    """
+    tables = getattr(table_data, "tables", None)
+    if tables is None:
+        # Plain lists/dicts (e.g. from callers other than the pipeline)
+        return json.dumps(table_data, separators=(",", ":"), ensure_ascii=False, default=str)[:budget]
+
+    parts = []
+    used = 2  # enclosing brackets
+    for table in tables:
+        part = json.dumps({"h": table.headers, "r": table.rows}, separators=(",", ":"), ensure_ascii=False)
+        if used + len(part) + 1 > budget:
+            logger.info("Table prompt budget reached", included=len(parts), total=len(tables))
+            break
+        parts.append(part)
+        used += len(part) + 1
+    return "[" + ",".join(parts) + "]"
+
+# ─── Client ──────────────────────────────────────────────────────────────────
+
+@functools.lru_cache(maxsize=4)
+def _get_client(api_key: str) -> Anthropic:
+    """One pooled client per API key, so keep-alive connections survive across calls."""
+    return Anthropic(
+        api_key=api_key,
+        http_client=httpx.Client(limits=httpx.Limits(max_keepalive_connections=8, max_connections=16)),
+    )
+
+# ─── Response Cache ──────────────────────────────────────────────────────────
+
+_cache_client: Optional[redis.Redis] = None
+
+
+def _get_cache() -> Optional[redis.Redis]:
+    global _cache_client
+    url = os.getenv("REDIS_URL")
+    if not url:
+        return None
+    if _cache_client is None:
+        _cache_client = redis.Redis.from_url(url, socket_timeout=1.0)
+    return _cache_client
+
+
+def _cache_key(doc_text: str, table_str: str) -> str:
+    digest = hashlib.sha256(
+        "\x1e".join((doc_text, table_str, SYSTEM_PROMPT, NER_MODEL)).encode()
+    ).hexdigest()
+    return f"{NER_CACHE_PREFIX}{digest}"
+
+
+def _cache_get(key: str) -> Optional[Dict[str, Any]]:
+    cache = _get_cache()
+    if cache is None:
+        return None
+    try:
+        cached = cache.get(key)
+    except redis.RedisError as e:
+        logger.warning("NER cache read failed", error=str(e))
+        return None
+    return json.loads(cached) if cached else None
+
+
+def _cache_set(key: str, data: Dict[str, Any]):
+    cache = _get_cache()
+    if cache is None:
+        return
+    try:
+        cache.setex(key, NER_CACHE_TTL_SECONDS, json.dumps(data))
+    except redis.RedisError as e:
+        logger.warning("NER cache write failed", error=str(e))
+
 # ─── Main Function ───────────────────────────────────────────────────────────
 
 def analyze_financial_document(
@@ -87,47 +269,124 @@ def analyze_financial_document(
         logger.warning("No valid Anthropic API key found. Returning mock data for development.")
         return _get_mock_response()
 
-    client = Anthropic(api_key=key)
-    
     # Prepare table content for prompt
-    table_str = str(table_data) # Simple stringification for now, can be optimized
-    
-    prompt = USER_PROMPT_TEMPLATE.format(
-        text_content=doc_text[:100000], # Truncate to avoid token limits if massive
-        table_content=table_str[:50000]
-    )
+    table_str = _serialize_tables_for_prompt(table_data)
+
+    cache_key = _cache_key(doc_text, table_str)
+    cached = _cache_get(cache_key)
+    if cached is not None:
+        logger.info("Financial NER cache hit", key=cache_key)
+        return cached
+
+    client = _get_client(key)
+
+    prompt = f"{_PROMPT_PREFIX}{_select_financial_pages(doc_text)}{_PROMPT_MID}{table_str}{_PROMPT_SUFFIX}"
 
     try:
         logger.info("Sending request to Claude Opus 4.6 for Financial NER")
         message = client.messages.create(
-            model="claude-3-opus-20240229",
+            model=NER_MODEL,
             max_tokens=4096,
             temperature=0.0,
-            system=SYSTEM_PROMPT,
+            # Static system prompt is marked cacheable so repeat calls reuse its prefix
+            system=[{"type": "text", "text": SYSTEM_PROMPT, "cache_control": {"type": "ephemeral"}}],
             messages=[
                 {"role": "user", "content": prompt}
-            ]
+            ],
+            tools=[EMIT_FINANCIALS_TOOL],
+            tool_choice={"type": "tool", "name": EMIT_FINANCIALS_TOOL["name"]},
         )
         
-        # Parse response - assuming Claude returns JSON usage
-        # In a real scenario we'd use tool_use or JSON mode
-        response_text = message.content[0].text
-        
-        # Simple JSON extraction (robustness improvement needed for prod)
-        json_start = response_text.find('{')
-        json_end = response_text.rfind('}') + 1
-        if json_start != -1 and json_end != -1:
-            json_str = response_text[json_start:json_end]
-            data = json.loads(json_str)
-            return data
-        else:
-            logger.error("Failed to parse JSON from Claude response")
-            return _get_mock_response(error="JSON Parse Error")
+        # Structured output arrives as the forced tool call's input
+        tool_use = next((block for block in message.content if block.type == "tool_use"), None)
+        if tool_use is None:
+            logger.error("Claude response contained no tool_use block")
+            return _get_mock_response(error="Missing tool_use block")
+
+        data = ExtractionResult.model_validate(tool_use.input).model_dump()
+        _cache_set(cache_key, data)
+        return data
 
     except Exception as e:
         logger.error(f"Error calling Anthropic API: {str(e)}")
         return _get_mock_response(error=str(e))
 
+def analyze_financial_documents(
+    documents: List[tuple[str, Any]],
+    api_key: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """
+    Analyze several small documents with a single Claude call.
+
+    Args:
+        documents: (doc_text, table_data) pairs.
+        api_key: Anthropic API key. If None, looks for ANTHROPIC_API_KEY env var.
+
+    Returns:
+        One ExtractionResult dict per document, in input order.
+    """
+    if len(documents) == 1:
+        doc_text, table_data = documents[0]
+        return [analyze_financial_document(doc_text, table_data, api_key=api_key)]
+
+    key = api_key or os.getenv("ANTHROPIC_API_KEY")
+    if not key or key.startswith("dummy"):
+        logger.warning("No valid Anthropic API key found. Returning mock data for development.")
+        return [_get_mock_response() for _ in documents]
+
+    table_strs = [_serialize_tables_for_prompt(table_data) for _, table_data in documents]
+    cache_keys = [_cache_key(doc_text, table_str) for (doc_text, _), table_str in zip(documents, table_strs)]
+    results: List[Optional[Dict[str, Any]]] = [_cache_get(k) for k in cache_keys]
+    pending = [i for i, result in enumerate(results) if result is None]
+    if not pending:
+        return results
+
+    prompt = "".join(
+        f"{_BATCH_DOC_PREFIX}{n}{_BATCH_DOC_TEXT}{_select_financial_pages(documents[i][0])}"
+        f"{_BATCH_DOC_TABLES}{table_strs[i]}{_BATCH_DOC_SUFFIX}"
+        for n, i in enumerate(pending, start=1)
+    ) + BATCH_INSTRUCTIONS.format(count=len(pending))
+
+    try:
+        logger.info("Sending batched request to Claude Opus 4.6 for Financial NER", documents=len(pending))
+        message = _get_client(key).messages.create(
+            model=NER_MODEL,
+            # Model output cap; an overflowing batch fails validation and falls back to single calls
+            max_tokens=4096,
+            temperature=0.0,
+            system=[{"type": "text", "text": SYSTEM_PROMPT, "cache_control": {"type": "ephemeral"}}],
+            messages=[
+                {"role": "user", "content": prompt}
+            ],
+            tools=[EMIT_FINANCIALS_BATCH_TOOL],
+            tool_choice={"type": "tool", "name": EMIT_FINANCIALS_BATCH_TOOL["name"]},
+        )
+
+        tool_use = next((block for block in message.content if block.type == "tool_use"), None)
+        try:
+            batch = BatchExtractionResult.model_validate(tool_use.input) if tool_use is not None else None
+        except ValidationError as e:
+            # e.g. a batch that overflowed max_tokens — same recovery as a misaligned one
+            logger.warning("Batched NER response failed validation", error=str(e))
+            batch = None
+        if batch is None or len(batch.documents) != len(pending):
+            # Can't attribute entries to documents reliably — analyze each on its own
+            logger.warning("Batched NER response misaligned, falling back to single calls", documents=len(pending))
+            for i in pending:
+                results[i] = analyze_financial_document(documents[i][0], documents[i][1], api_key=key)
+            return results
+
+        for i, extraction in zip(pending, batch.documents):
+            results[i] = extraction.model_dump()
+            _cache_set(cache_keys[i], results[i])
+        return results
+
+    except Exception as e:
+        logger.error(f"Error calling Anthropic API: {str(e)}")
+        for i in pending:
+            results[i] = _get_mock_response(error=str(e))
+        return results
+
 def _get_mock_response(error: str = None) -> Dict[str, Any]:
     """Returns structured mock data when API is unavailable or fails."""
     return {
@@ -12,8 +12,11 @@ Label taxonomy derived from:
 """
 
 import re
+import sys
 from dataclasses import dataclass, field
-from typing import Optional
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Mapping, NamedTuple, Optional, Sequence
 
 import structlog
 
@@ -580,9 +583,32 @@ XBRL_TAG_TO_STANDARD: dict[str, tuple[str, str]] = {
 }
 
 
+
+# ─── Freeze Mappings ─────────────────────────────────────────────────────────
+# Read-only views over interned strings: the taxonomy is shared, never mutated,
+# and identical labels resolve to a single str object.
+
+class StandardMapping(NamedTuple):
+    """Target of a taxonomy lookup (tuple layout, so it still unpacks as (key, statement))."""
+    key: str
+    statement: str
+
+
+def _freeze(mapping: dict[str, str]) -> Mapping[str, str]:
+    return MappingProxyType({sys.intern(k): sys.intern(v) for k, v in mapping.items()})
+
+
+INCOME_STATEMENT_MAPPINGS = _freeze(INCOME_STATEMENT_MAPPINGS)
+BALANCE_SHEET_MAPPINGS = _freeze(BALANCE_SHEET_MAPPINGS)
+CASH_FLOW_MAPPINGS = _freeze(CASH_FLOW_MAPPINGS)
+XBRL_TAG_TO_STANDARD = MappingProxyType({
+    sys.intern(tag): StandardMapping(sys.intern(std), sys.intern(stmt))
+    for tag, (std, stmt) in XBRL_TAG_TO_STANDARD.items()
+})
+
 # ─── Data Types ──────────────────────────────────────────────────────────────
 
-@dataclass
+@dataclass(slots=True)
 class NormalizedLineItem:
     """A normalized financial line item."""
     original_label: str
@@ -593,7 +619,7 @@ class NormalizedLineItem:
     match_method: str = "exact"  # "exact", "prefix", "xbrl_tag", "fuzzy"
 
 
-@dataclass
+@dataclass(slots=True)
 class SpreadResult:
     """Result of financial spreading (normalization)."""
     income_statement: list[NormalizedLineItem] = field(default_factory=list)
@@ -601,6 +627,8 @@ class SpreadResult:
     cash_flow: list[NormalizedLineItem] = field(default_factory=list)
     unmapped_items: list[dict] = field(default_factory=list)
     periods: list[str] = field(default_factory=list)
+    # standardized_label → {period: value} across all three statements, filled as items are mapped
+    statements: dict[str, dict[str, Optional[float]]] = field(default_factory=dict)
     mapping_stats: dict = field(default_factory=lambda: {
         "exact": 0, "prefix": 0, "xbrl_tag": 0, "fuzzy": 0, "unmapped": 0
     })
@@ -608,48 +636,102 @@ class SpreadResult:
 
 # ─── Label Normalization & Matching ──────────────────────────────────────────
 
+_NOISE_CHARS = str.maketrans('', '', ',.:$()')
+# Footnote markers like "(1)" reach this as a bare trailing number, since the parentheses
+# are stripped with the other noise characters first
+_TRAILING_NUMBER_RE = re.compile(r'\s*\d+$')
+
+
+@lru_cache(maxsize=8192)
 def normalize_label(label: str) -> str:
-    """Normalize a label for matching."""
-    # Lowercase, strip, remove extra whitespace
-    normalized = label.lower().strip()
-    normalized = re.sub(r'\s+', ' ', normalized)
+    """Normalize a label for matching (memoized per raw label)."""
+    # Lowercase, strip, collapse whitespace runs (split/join: one C pass, no regex)
+    normalized = ' '.join(label.lower().split())
     # Remove common noise
-    normalized = normalized.replace(',', '')
-    normalized = normalized.replace('.', '')
-    normalized = normalized.replace(':', '')
-    normalized = normalized.replace('$', '')
-    normalized = normalized.replace('(', '').replace(')', '')
+    normalized = normalized.translate(_NOISE_CHARS)
     # Remove trailing numbers / footnote references
-    normalized = re.sub(r'\s*\(\d+\)\s*$', '', normalized)
-    normalized = re.sub(r'\s*\d+$', '', normalized)
-    # Remove leading/trailing hyphens and underscores
-    normalized = normalized.strip('-_ ')
-    return normalized.strip()
+    normalized = _TRAILING_NUMBER_RE.sub('', normalized)
+    # Remove leading/trailing hyphens, underscores, and the spaces left behind.
+    # Interned like the taxonomy keys, so an exact-match probe compares by identity.
+    return sys.intern(normalized.strip('-_ '))
 
 
-def _tokenize(label: str) -> set[str]:
-    """Split a label into meaningful tokens for fuzzy matching."""
-    stop_words = {"and", "the", "of", "or", "in", "for", "to", "from", "at", "on", "by", "net", "total"}
-    tokens = set(re.split(r'[\s&/\-_]+', label.lower()))
-    return tokens - stop_words - {""}
+_STOP_WORDS = frozenset({"and", "the", "of", "or", "in", "for", "to", "from", "at", "on", "by", "net", "total", ""})
+_TOKEN_SPLIT_RE = re.compile(r'[\s&/\-_]+')
 
 
-def _fuzzy_score(label_tokens: set[str], mapping_tokens: set[str]) -> float:
-    """Calculate token overlap score between two labels (Jaccard-like)."""
-    if not label_tokens or not mapping_tokens:
-        return 0.0
-    intersection = label_tokens & mapping_tokens
-    union = label_tokens | mapping_tokens
-    return len(intersection) / len(union) if union else 0.0
+def _tokenize(label: str) -> frozenset[str]:
+    """Split a label into meaningful tokens for fuzzy matching."""
+    return frozenset(_TOKEN_SPLIT_RE.split(label.lower())) - _STOP_WORDS
 
 
 FUZZY_THRESHOLD = 0.6  # Minimum token overlap score to consider a fuzzy match
 
-
+# Flat taxonomy: normalized label → (standardized_label, statement_type), in lookup order
+# (income → balance → cash flow); a label in several statements keeps its first mapping.
+# Keys go through normalize_label at build time so they are in the same canonical form as
+# the inputs probing them (e.g. "net income (loss)" is stored as "net income loss").
+_LABEL_TARGETS: dict[str, StandardMapping] = {}
+for _mapping, _stmt_type in (
+    (INCOME_STATEMENT_MAPPINGS, "income_statement"),
+    (BALANCE_SHEET_MAPPINGS, "balance_sheet"),
+    (CASH_FLOW_MAPPINGS, "cash_flow"),
+):
+    for _key, _value in _mapping.items():
+        _LABEL_TARGETS.setdefault(sys.intern(normalize_label(_key)), StandardMapping(_value, _stmt_type))
+
+# Prefix matching, trie-style on the first character: keys are bucketed by their leading
+# character and each bucket is one alternation. re tries alternatives left to right, so
+# the first matching key in taxonomy order still wins, as with a sequential scan.
+# Buckets are compiled on first use: compiling all of them was about half of import time,
+# and a typical document only ever touches a handful of leading characters.
+_prefix_buckets: dict[str, list[str]] = {}
+for _key in _LABEL_TARGETS:
+    _prefix_buckets.setdefault(_key[0], []).append(re.escape(_key))
+
+
+@lru_cache(maxsize=None)
+def _prefix_re(char: str) -> Optional[re.Pattern]:
+    keys = _prefix_buckets.get(char)
+    return re.compile("|".join(keys)) if keys else None
+
+
+# Pre-tokenized mapping keys (in taxonomy order) and a token → key-position index for fuzzy matching.
+# Each taxonomy token gets one bit, so a key's token set is an int mask (plus its size) and
+# the Jaccard overlap is a popcount instead of a set intersection.
+_FUZZY_KEY_TOKENS = [
+    (_tokenize(normalize_label(_key)), _value, _stmt_type)
+    for _mapping, _stmt_type in (
+        (INCOME_STATEMENT_MAPPINGS, "income_statement"),
+        (BALANCE_SHEET_MAPPINGS, "balance_sheet"),
+        (CASH_FLOW_MAPPINGS, "cash_flow"),
+    )
+    for _key, _value in _mapping.items()
+]
+_TOKEN_BITS: dict[str, int] = {}
+for _tokens, _, _ in _FUZZY_KEY_TOKENS:
+    for _token in sorted(_tokens):
+        _TOKEN_BITS.setdefault(_token, 1 << len(_TOKEN_BITS))
+
+_FUZZY_KEYS: list[tuple[int, int, str, str]] = [
+    (sum(_TOKEN_BITS[_token] for _token in _tokens), len(_tokens), _value, _stmt_type)
+    for _tokens, _value, _stmt_type in _FUZZY_KEY_TOKENS
+]
+_FUZZY_TOKEN_INDEX: dict[str, list[int]] = {}
+for _i, (_tokens, _, _) in enumerate(_FUZZY_KEY_TOKENS):
+    for _token in _tokens:
+        _FUZZY_TOKEN_INDEX.setdefault(_token, []).append(_i)
+del _FUZZY_KEY_TOKENS
+
+
+@lru_cache(maxsize=8192)
 def map_label(label: str) -> tuple[Optional[str], str, str, float]:
     """
     Map a financial label to its standardized form.
 
+    Memoized: the same raw labels recur across periods, tables, and filings,
+    so repeats skip normalization and matching entirely.
+
     Returns:
         Tuple of (standardized_label, statement_type, match_method, confidence).
         If no mapping found, returns (None, "unknown", "none", 0.0).
@@ -661,38 +743,43 @@ def map_label(label: str) -> tuple[Optional[str], str, str, float]:
     tag_name = label.strip()
     if ":" in tag_name:
         tag_name = tag_name.split(":", 1)[1]
-    if tag_name in XBRL_TAG_TO_STANDARD:
-        std, stmt = XBRL_TAG_TO_STANDARD[tag_name]
-        return std, stmt, "xbrl_tag", 1.0
-
-    # 2. Exact match in mappings
-    mappings_with_types = [
-        (INCOME_STATEMENT_MAPPINGS, "income_statement"),
-        (BALANCE_SHEET_MAPPINGS, "balance_sheet"),
-        (CASH_FLOW_MAPPINGS, "cash_flow"),
-    ]
-    for mapping, stmt_type in mappings_with_types:
-        if normalized in mapping:
-            return mapping[normalized], stmt_type, "exact", 1.0
-
-    # 3. Prefix match (label starts with a known mapping key)
-    for mapping, stmt_type in mappings_with_types:
-        for key, value in mapping.items():
-            if normalized.startswith(key):
-                return value, stmt_type, "prefix", 0.9
-
-    # 4. Fuzzy token overlap matching
+    xbrl_target = XBRL_TAG_TO_STANDARD.get(tag_name)
+    if xbrl_target:
+        return xbrl_target.key, xbrl_target.statement, "xbrl_tag", 1.0
+
+    # 2. Exact match — one probe of the flat taxonomy
+    target = _LABEL_TARGETS.get(normalized)
+    if target:
+        return target.key, target.statement, "exact", 1.0
+
+    # 3. Prefix match (label starts with a known mapping key) — only keys sharing its first character
+    prefix_re = _prefix_re(normalized[:1])
+    match = prefix_re.match(normalized) if prefix_re else None
+    if match:
+        target = _LABEL_TARGETS[match.group(0)]
+        return target.key, target.statement, "prefix", 0.9
+
+    # 4. Fuzzy token overlap matching — only keys sharing a token can score above 0,
+    # and they are visited in taxonomy order so ties resolve as before
     label_tokens = _tokenize(normalized)
+    label_mask = 0
+    for token in label_tokens:
+        label_mask |= _TOKEN_BITS.get(token, 0)
+    label_size = len(label_tokens)
     best_score = 0.0
     best_match = None
 
-    for mapping, stmt_type in mappings_with_types:
-        for key, value in mapping.items():
-            key_tokens = _tokenize(key)
-            score = _fuzzy_score(label_tokens, key_tokens)
-            if score > best_score:
-                best_score = score
-                best_match = (value, stmt_type)
+    candidates = sorted({i for token in label_tokens for i in _FUZZY_TOKEN_INDEX.get(token, ())})
+    for i in candidates:
+        key_mask, key_size, value, stmt_type = _FUZZY_KEYS[i]
+        # Jaccard: |A ∩ B| / |A ∪ B|; tokens outside the taxonomy only widen the union
+        overlap = (label_mask & key_mask).bit_count()
+        score = overlap / (label_size + key_size - overlap)
+        if score > best_score:
+            best_score = score
+            best_match = (value, stmt_type)
+            if score == 1.0:
+                break  # nothing later can score strictly higher
 
     if best_score >= FUZZY_THRESHOLD and best_match:
         return best_match[0], best_match[1], "fuzzy", round(best_score, 2)
@@ -702,32 +789,46 @@ def map_label(label: str) -> tuple[Optional[str], str, str, float]:
 
 def spread_financial_data(
     labels: list[str],
-    values_by_period: dict[str, list[Optional[float]]],
+    values_by_period: dict[str, Sequence[Optional[float]]],
 ) -> SpreadResult:
     """
     Normalize financial data into standardized statements.
 
     Args:
         labels: List of financial line item labels (as extracted).
-        values_by_period: Dict mapping period names to value lists
-                          (same length as labels).
+        values_by_period: Dict mapping period names to value lists or float
+                          arrays (same length as labels; None/NaN = missing).
 
     Returns:
         SpreadResult with normalized statements.
     """
     result = SpreadResult(periods=list(values_by_period.keys()))
 
+    # Convert each period column to plain floats once, column-wise, instead of per cell;
+    # float arrays go through a single tolist() rather than boxing one scalar at a time
+    columns = {
+        period: [
+            None if value is None or value != value else float(value)
+            for value in (values.tolist() if hasattr(values, "tolist") else values)
+        ]
+        for period, values in values_by_period.items()
+    }
+    # statement_type → the result list it fills, so each mapped item is one dict probe + append
+    statement_items = {
+        "income_statement": result.income_statement,
+        "balance_sheet": result.balance_sheet,
+        "cash_flow": result.cash_flow,
+    }
+    stats = result.mapping_stats
+
     for i, label in enumerate(labels):
         if not label or not label.strip():
             continue
 
         std_label, statement_type, match_method, confidence = map_label(label)
 
-        # Build values dict for this line item
-        item_values = {}
-        for period, values in values_by_period.items():
-            if i < len(values):
-                item_values[period] = values[i]
+        # Build values dict for this line item (NaN from float arrays means missing)
+        item_values = {period: column[i] for period, column in columns.items() if i < len(column)}
 
         if std_label:
             item = NormalizedLineItem(
@@ -739,21 +840,16 @@ def spread_financial_data(
                 match_method=match_method,
             )
 
-            if statement_type == "income_statement":
-                result.income_statement.append(item)
-            elif statement_type == "balance_sheet":
-                result.balance_sheet.append(item)
-            elif statement_type == "cash_flow":
-                result.cash_flow.append(item)
-
-            result.mapping_stats[match_method] = result.mapping_stats.get(match_method, 0) + 1
+            statement_items[statement_type].append(item)
+            result.statements[std_label] = item_values
+            stats[match_method] += 1
         else:
             result.unmapped_items.append({
                 "label": label,
                 "values": item_values,
                 "suggestion": "Review manually or add to mapping",
             })
-            result.mapping_stats["unmapped"] += 1
+            stats["unmapped"] += 1
 
     mapped = (
         len(result.income_statement)
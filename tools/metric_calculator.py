@@ -7,6 +7,7 @@ All logic is DETERMINISTIC — no LLM involved.
 
 from typing import Optional
 
+import numpy as np
 import structlog
 
 logger = structlog.get_logger()
@@ -26,6 +27,23 @@ def safe_subtract(a: Optional[float], b: Optional[float]) -> Optional[float]:
     return a - b
 
 
+def series(statements: dict[str, dict[str, Optional[float]]], label: str, periods: list[str]) -> np.ndarray:
+    """One statement line as a float array over periods (NaN = missing)."""
+    values = statements.get(label, {})
+    return np.array([values.get(period) for period in periods], dtype=np.float64)
+
+
+def _ratio(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    """Element-wise safe_divide: NaN where either side is missing or the denominator is zero."""
+    return np.divide(numerator, denominator, out=np.full(numerator.shape, np.nan), where=denominator != 0)
+
+
+def _growth(series: np.ndarray) -> np.ndarray:
+    """Period-over-period change relative to the previous period (one shorter than series)."""
+    previous = series[:-1]
+    return _ratio(series[1:] - previous, previous)
+
+
 def calculate_metrics(
     statements: dict[str, dict[str, Optional[float]]],
     periods: list[str],
@@ -33,6 +51,9 @@ def calculate_metrics(
     """
     Calculate financial metrics from normalized statements.
 
+    Every ratio is computed across all periods at once on float arrays,
+    with NaN standing in for missing values until the final conversion.
+
     Args:
         statements: Dict mapping standardized_label → {period: value}
         periods: List of period names.
@@ -47,122 +68,66 @@ def calculate_metrics(
         Growth: revenue_growth, net_income_growth
     """
     metrics: dict[str, dict[str, Optional[float]]] = {}
-
-    for period in periods:
-        # Helper to get a value for this period
-        def get(label: str) -> Optional[float]:
-            return statements.get(label, {}).get(period)
-
+    if not periods:
+        return metrics
+
+    # Each statement line is read into an array exactly once
+    def get(label: str) -> np.ndarray:
+        return series(statements, label, periods)
+
+    revenue = get("total_revenue")
+    operating_income = get("operating_income")
+    net_income = get("net_income")
+    total_assets = get("total_assets")
+    total_equity = get("total_equity")
+    total_liabilities = get("total_liabilities")
+    current_assets = get("total_current_assets")
+    current_liabilities = get("total_current_liabilities")
+
+    # EBITDA, calculated from components where not reported
+    ebitda = get("ebitda")
+    ebitda = np.where(np.isnan(ebitda), operating_income + np.abs(get("depreciation_amortization")), ebitda)
+
+    # Quick assets = Current Assets - Inventories (missing inventories count as zero)
+    quick_assets = current_assets - np.nan_to_num(get("inventories"), nan=0.0)
+
+    ratios = {
         # ─── Profitability Ratios ─────────────────────────────────────
-
-        # Gross Margin = Gross Profit / Revenue
-        metrics.setdefault("gross_margin", {})[period] = safe_divide(
-            get("gross_profit"), get("total_revenue")
-        )
-
-        # EBITDA Margin = EBITDA / Revenue
-        ebitda = get("ebitda")
-        if ebitda is None:
-            # Calculate EBITDA from components if available
-            op_income = get("operating_income")
-            da = get("depreciation_amortization")
-            if op_income is not None and da is not None:
-                ebitda = op_income + abs(da)
-        metrics.setdefault("ebitda_margin", {})[period] = safe_divide(
-            ebitda, get("total_revenue")
-        )
-
-        # Operating Margin = Operating Income / Revenue
-        metrics.setdefault("operating_margin", {})[period] = safe_divide(
-            get("operating_income"), get("total_revenue")
-        )
-
-        # Net Margin = Net Income / Revenue
-        metrics.setdefault("net_margin", {})[period] = safe_divide(
-            get("net_income"), get("total_revenue")
-        )
-
-        # ROE = Net Income / Total Equity
-        metrics.setdefault("return_on_equity", {})[period] = safe_divide(
-            get("net_income"), get("total_equity")
-        )
-
-        # ROA = Net Income / Total Assets
-        metrics.setdefault("return_on_assets", {})[period] = safe_divide(
-            get("net_income"), get("total_assets")
-        )
-
+        "gross_margin": _ratio(get("gross_profit"), revenue),
+        "ebitda_margin": _ratio(ebitda, revenue),
+        "operating_margin": _ratio(operating_income, revenue),
+        "net_margin": _ratio(net_income, revenue),
+        "return_on_equity": _ratio(net_income, total_equity),
+        "return_on_assets": _ratio(net_income, total_assets),
         # ─── Liquidity Ratios ─────────────────────────────────────────
-
-        # Current Ratio = Current Assets / Current Liabilities
-        metrics.setdefault("current_ratio", {})[period] = safe_divide(
-            get("total_current_assets"), get("total_current_liabilities")
-        )
-
-        # Quick Ratio = (Current Assets - Inventories) / Current Liabilities
-        current_assets = get("total_current_assets")
-        inventories = get("inventories") or 0
-        if current_assets is not None:
-            quick_assets = current_assets - inventories
-            metrics.setdefault("quick_ratio", {})[period] = safe_divide(
-                quick_assets, get("total_current_liabilities")
-            )
-        else:
-            metrics.setdefault("quick_ratio", {})[period] = None
-
+        "current_ratio": _ratio(current_assets, current_liabilities),
+        "quick_ratio": _ratio(quick_assets, current_liabilities),
         # ─── Leverage Ratios ──────────────────────────────────────────
+        "debt_to_equity": _ratio(total_liabilities, total_equity),
+        "debt_to_assets": _ratio(total_liabilities, total_assets),
+        # Interest expense is sometimes reported negative
+        "interest_coverage": _ratio(operating_income, np.abs(get("interest_expense"))),
+    }
 
-        # Debt-to-Equity = Total Liabilities / Total Equity
-        metrics.setdefault("debt_to_equity", {})[period] = safe_divide(
-            get("total_liabilities"), get("total_equity")
-        )
-
-        # Debt-to-Assets = Total Liabilities / Total Assets
-        metrics.setdefault("debt_to_assets", {})[period] = safe_divide(
-            get("total_liabilities"), get("total_assets")
-        )
-
-        # Interest Coverage = Operating Income / Interest Expense
-        interest = get("interest_expense")
-        if interest is not None:
-            interest = abs(interest)  # Interest expense is sometimes negative
-        metrics.setdefault("interest_coverage", {})[period] = safe_divide(
-            get("operating_income"), interest
-        )
+    # Round to 4 decimal places; NaN (missing or undefined) becomes None
+    for name, values in ratios.items():
+        metrics[name] = {
+            period: None if value != value else round(value, 4)
+            for period, value in zip(periods, values.tolist())
+        }
 
     # ─── Growth Rates (require consecutive periods) ───────────────────
 
-    for i in range(1, len(periods)):
-        curr_period = periods[i]
-        prev_period = periods[i - 1]
-
-        # Revenue Growth
-        curr_rev = statements.get("total_revenue", {}).get(curr_period)
-        prev_rev = statements.get("total_revenue", {}).get(prev_period)
-        metrics.setdefault("revenue_growth", {})[curr_period] = (
-            safe_divide(safe_subtract(curr_rev, prev_rev), prev_rev)
-        )
-
-        # Net Income Growth
-        curr_ni = statements.get("net_income", {}).get(curr_period)
-        prev_ni = statements.get("net_income", {}).get(prev_period)
-        metrics.setdefault("net_income_growth", {})[curr_period] = (
-            safe_divide(safe_subtract(curr_ni, prev_ni), prev_ni)
-        )
-
-        # Operating Cash Flow Growth
-        curr_ocf = statements.get("operating_cash_flow", {}).get(curr_period)
-        prev_ocf = statements.get("operating_cash_flow", {}).get(prev_period)
-        metrics.setdefault("operating_cf_growth", {})[curr_period] = (
-            safe_divide(safe_subtract(curr_ocf, prev_ocf), prev_ocf)
-        )
-
-    # Round all metrics to 4 decimal places
-    for metric_name in metrics:
-        for period in metrics[metric_name]:
-            val = metrics[metric_name][period]
-            if val is not None:
-                metrics[metric_name][period] = round(val, 4)
+    if len(periods) > 1:
+        for name, line in (
+            ("revenue_growth", revenue),
+            ("net_income_growth", net_income),
+            ("operating_cf_growth", get("operating_cash_flow")),
+        ):
+            metrics[name] = {
+                period: None if value != value else round(value, 4)
+                for period, value in zip(periods[1:], _growth(line).tolist())
+            }
 
     logger.info(
         "Metric calculation complete",
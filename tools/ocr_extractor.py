@@ -8,18 +8,40 @@ Strategy:
 3. Return page-level text blocks with bounding boxes
 """
 
-import io
+import asyncio
 import os
+import threading
 from dataclasses import dataclass, field
 from pathlib import Path
 
 import fitz  # PyMuPDF
 import structlog
 
+from tools.process_pool import PROCESS_WORKERS, run_all
+
+# OCR backends are optional and resolved once, not per scanned page
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+try:
+    import tesserocr  # in-process libtesseract
+except ImportError:
+    tesserocr = None
+try:
+    import pytesseract  # tesseract CLI wrapper (fallback)
+except ImportError:
+    pytesseract = None
+
 logger = structlog.get_logger()
 
+# Pages are extracted on the shared process pool (OCR is CPU-bound); short documents stay in-process
+PARALLEL_MIN_PAGES = 4
+# Scanned pages are rendered at this resolution; 200 DPI is plenty for printed statements
+OCR_DPI = 200
+
 
-@dataclass
+@dataclass(slots=True)
 class TextBlock:
     """A block of text extracted from a page."""
     text: str
@@ -32,7 +54,7 @@ class TextBlock:
     method: str = "native"  # "native" or "ocr"
 
 
-@dataclass
+@dataclass(slots=True)
 class PageExtraction:
     """Extraction results for a single page."""
     page_number: int
@@ -42,7 +64,7 @@ class PageExtraction:
     method: str = "native"
 
 
-@dataclass
+@dataclass(slots=True)
 class DocumentExtraction:
     """Complete extraction results for a document."""
     file_path: str
@@ -56,7 +78,7 @@ class DocumentExtraction:
         return "\n\n".join(p.full_text for p in self.pages if p.full_text)
 
 
-def extract_text_from_pdf(file_path: str) -> DocumentExtraction:
+def extract_text_from_pdf(file_path: str, parallel: bool = True) -> DocumentExtraction:
     """
     Extract text from a PDF file.
 
@@ -65,6 +87,8 @@ def extract_text_from_pdf(file_path: str) -> DocumentExtraction:
 
     Args:
         file_path: Path to the PDF file.
+        parallel: Spread pages over a process pool for documents of
+                  PARALLEL_MIN_PAGES or more.
 
     Returns:
         DocumentExtraction with page-level text and coordinates.
@@ -81,12 +105,17 @@ def extract_text_from_pdf(file_path: str) -> DocumentExtraction:
 
         logger.info("Starting PDF extraction", file=file_path, pages=len(doc))
 
-        for page_num in range(len(doc)):
-            page = doc[page_num]
-            page_extraction = _extract_page(page, page_num + 1)
-            result.pages.append(page_extraction)
+        workers = min(PROCESS_WORKERS, result.total_pages) if parallel and result.total_pages >= PARALLEL_MIN_PAGES else 1
+        if workers > 1:
+            doc.close()
+            result.pages = _extract_pages_parallel(file_path, result.total_pages, workers)
+        else:
+            for page_num in range(len(doc)):
+                page = doc[page_num]
+                page_extraction = _extract_page(page, page_num + 1)
+                result.pages.append(page_extraction)
 
-        doc.close()
+            doc.close()
 
         logger.info(
             "PDF extraction complete",
@@ -103,33 +132,55 @@ def extract_text_from_pdf(file_path: str) -> DocumentExtraction:
     return result
 
 
+async def extract_many(file_paths: list[str], concurrency: int = 4) -> list[DocumentExtraction]:
+    """
+    Extract several PDFs concurrently, returning results in input order.
+
+    Each file runs in a worker thread; at most `concurrency` files are in flight so a
+    large batch doesn't hold every document in memory at once. Pages within a file
+    are still spread over the shared process pool, which every file queues into.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def extract(file_path: str) -> DocumentExtraction:
+        async with semaphore:
+            return await asyncio.to_thread(extract_text_from_pdf, file_path)
+
+    return await asyncio.gather(*(extract(path) for path in file_paths))
+
+
+def _extract_pages_parallel(file_path: str, total_pages: int, workers: int) -> list[PageExtraction]:
+    """Extract contiguous page ranges on the shared process pool, preserving page order."""
+    chunk = -(-total_pages // workers)
+    ranges = [(file_path, start, min(start + chunk, total_pages)) for start in range(0, total_pages, chunk)]
+    return [page for pages in run_all(_extract_page_range, ranges) for page in pages]
+
+
+def _extract_page_range(file_path: str, start: int, stop: int) -> list[PageExtraction]:
+    """Worker entry point: fitz documents don't pickle, so each worker opens its own."""
+    with fitz.open(file_path) as doc:
+        return [_extract_page(doc[page_num], page_num + 1) for page_num in range(start, stop)]
+
+
 def _extract_page(page: fitz.Page, page_number: int) -> PageExtraction:
     """Extract text from a single page."""
     extraction = PageExtraction(page_number=page_number)
 
-    # Try native text extraction first
-    text_dict = page.get_text("dict", flags=fitz.TEXTFLAGS_TEXT)
-    blocks = text_dict.get("blocks", [])
-
+    # Try native text extraction first. "blocks" yields flat (x0, y0, x1, y1, text, no, type)
+    # tuples from the same text page as "dict" without building the span/line dict tree,
+    # which is pure waste on scanned pages that end up going to OCR anyway.
     native_text_blocks = []
-    for block in blocks:
-        if block.get("type") == 0:  # Text block
-            block_text = ""
-            for line in block.get("lines", []):
-                for span in line.get("spans", []):
-                    block_text += span.get("text", "")
-                block_text += "\n"
-
+    for x0, y0, x1, y1, block_text, _, block_type in page.get_text("blocks", flags=fitz.TEXTFLAGS_TEXT):
+        if block_type == 0:  # Text block
             block_text = block_text.strip()
             if block_text:
-                bbox = block.get("bbox", (0, 0, 0, 0))
                 native_text_blocks.append(TextBlock(
                     text=block_text,
                     page_number=page_number,
-                    x=bbox[0],
-                    y=bbox[1],
-                    width=bbox[2] - bbox[0],
-                    height=bbox[3] - bbox[1],
+                    x=x0,
+                    y=y0,
+                    width=x1 - x0,
+                    height=y1 - y0,
                     confidence=1.0,
                     method="native",
                 ))
@@ -153,6 +204,7 @@ def _ocr_page(page: fitz.Page, page_number: int) -> PageExtraction:
     """
     OCR a scanned page using Tesseract.
 
+    Uses the in-process tesserocr bindings when installed, else pytesseract.
     Falls back gracefully if Tesseract is not installed.
     """
     extraction = PageExtraction(
@@ -161,67 +213,21 @@ def _ocr_page(page: fitz.Page, page_number: int) -> PageExtraction:
         method="ocr",
     )
 
-    try:
-        import pytesseract
-        from PIL import Image
-
-        # Render page to image at 300 DPI for good OCR quality
-        mat = fitz.Matrix(300 / 72, 300 / 72)
-        pix = page.get_pixmap(matrix=mat)
-        img_data = pix.tobytes("png")
-        image = Image.open(io.BytesIO(img_data))
-
-        # Run Tesseract OCR with detailed output
-        ocr_data = pytesseract.image_to_data(
-            image, output_type=pytesseract.Output.DICT
-        )
-
-        blocks = []
-        current_block = ""
-        current_block_num = -1
-        block_coords = {"x": 0, "y": 0, "w": 0, "h": 0}
+    if Image is None or (tesserocr is None and pytesseract is None):
+        logger.warning("Tesseract not available — skipping OCR", page=page_number)
+        return extraction
 
-        for i in range(len(ocr_data["text"])):
-            text = ocr_data["text"][i].strip()
-            block_num = ocr_data["block_num"][i]
-            conf = int(ocr_data["conf"][i])
+    try:
+        # Render straight to an 8-bit grayscale buffer — Tesseract binarizes anyway, so RGB
+        # and a PNG encode/decode round-trip only cost memory and time
+        mat = fitz.Matrix(OCR_DPI / 72, OCR_DPI / 72)
+        pix = page.get_pixmap(matrix=mat, colorspace=fitz.csGRAY, alpha=False)
+        image = Image.frombytes("L", (pix.width, pix.height), pix.samples)
 
-            if block_num != current_block_num and current_block:
-                # Save previous block
-                blocks.append(TextBlock(
-                    text=current_block.strip(),
-                    page_number=page_number,
-                    x=block_coords["x"],
-                    y=block_coords["y"],
-                    width=block_coords["w"],
-                    height=block_coords["h"],
-                    confidence=conf / 100.0,
-                    method="ocr",
-                ))
-                current_block = ""
-
-            current_block_num = block_num
-            if text and conf > 30:
-                current_block += text + " "
-                block_coords = {
-                    "x": ocr_data["left"][i],
-                    "y": ocr_data["top"][i],
-                    "w": ocr_data["width"][i],
-                    "h": ocr_data["height"][i],
-                }
-
-        # Don't forget the last block
-        if current_block.strip():
-            blocks.append(TextBlock(
-                text=current_block.strip(),
-                page_number=page_number,
-                x=block_coords["x"],
-                y=block_coords["y"],
-                width=block_coords["w"],
-                height=block_coords["h"],
-                confidence=0.8,
-                method="ocr",
-            ))
+        if tesserocr is not None:
+            blocks = _tesserocr_blocks(image, page_number)
+        else:
+            blocks = _pytesseract_blocks(image, page_number)
 
         extraction.blocks = blocks
         extraction.full_text = "\n".join(b.text for b in blocks)
@@ -232,11 +238,6 @@ def _ocr_page(page: fitz.Page, page_number: int) -> PageExtraction:
             blocks=len(blocks),
         )
 
-    except ImportError:
-        logger.warning("Tesseract not available — skipping OCR", page=page_number)
-        extraction.full_text = ""
-        extraction.blocks = []
-
     except Exception as e:
         logger.error("OCR failed", page=page_number, error=str(e))
         extraction.full_text = ""
@@ -244,6 +245,122 @@ def _ocr_page(page: fitz.Page, page_number: int) -> PageExtraction:
     return extraction
 
 
+# PyTessBaseAPI is not thread-safe, so each thread keeps its own engine; pipelines run on the
+# event loop's bounded thread pool, which caps how many engines a process ever loads
+_tesseract_local = threading.local()
+
+
+def _tesseract_api():
+    """The calling thread's resident Tesseract engine, so the language model loads once per thread."""
+    api = getattr(_tesseract_local, "api", None)
+    if api is None:
+        api = _tesseract_local.api = tesserocr.PyTessBaseAPI()
+    return api
+
+
+def _tesserocr_blocks(image, page_number: int) -> list[TextBlock]:
+    """
+    OCR through libtesseract in-process — no Tesseract subprocess per page.
+
+    Like the pytesseract path, the confidence threshold applies per word; surviving
+    words are then grouped by the block Tesseract assigned them to.
+    """
+    RIL = tesserocr.RIL
+
+    blocks = []
+
+    def close_block(words: list[tuple[str, float, tuple[int, int, int, int]]]):
+        if not words:
+            return
+        x1 = min(box[0] for _, _, box in words)
+        y1 = min(box[1] for _, _, box in words)
+        x2 = max(box[2] for _, _, box in words)
+        y2 = max(box[3] for _, _, box in words)
+        blocks.append(TextBlock(
+            text=" ".join(text for text, _, _ in words),
+            page_number=page_number,
+            x=x1,
+            y=y1,
+            width=x2 - x1,
+            height=y2 - y1,
+            confidence=sum(conf for _, conf, _ in words) / len(words) / 100.0,
+            method="ocr",
+        ))
+
+    api = _tesseract_api()
+    api.SetImage(image)
+    api.Recognize()
+
+    words: list[tuple[str, float, tuple[int, int, int, int]]] = []
+    for word in tesserocr.iterate_level(api.GetIterator(), RIL.WORD):
+        if word.IsAtBeginningOf(RIL.BLOCK):
+            close_block(words)
+            words = []
+        text = (word.GetUTF8Text(RIL.WORD) or "").strip()
+        conf = word.Confidence(RIL.WORD)
+        if text and conf > 30:
+            words.append((text, conf, word.BoundingBox(RIL.WORD)))
+    close_block(words)
+    return blocks
+
+
+def _pytesseract_blocks(image, page_number: int) -> list[TextBlock]:
+    """OCR through the tesseract CLI (one subprocess per call)."""
+    # Run Tesseract OCR with detailed output
+    ocr_data = pytesseract.image_to_data(
+        image, output_type=pytesseract.Output.DICT
+    )
+
+    blocks = []
+    current_parts: list[str] = []  # words of the open block, joined once when it closes
+    current_block_num = -1
+    block_coords = {"x": 0, "y": 0, "w": 0, "h": 0}
+
+    for i in range(len(ocr_data["text"])):
+        text = ocr_data["text"][i].strip()
+        block_num = ocr_data["block_num"][i]
+        conf = int(ocr_data["conf"][i])
+
+        if block_num != current_block_num and current_parts:
+            # Save previous block
+            blocks.append(TextBlock(
+                text=" ".join(current_parts),
+                page_number=page_number,
+                x=block_coords["x"],
+                y=block_coords["y"],
+                width=block_coords["w"],
+                height=block_coords["h"],
+                confidence=conf / 100.0,
+                method="ocr",
+            ))
+            current_parts = []
+
+        current_block_num = block_num
+        if text and conf > 30:
+            current_parts.append(text)
+            block_coords = {
+                "x": ocr_data["left"][i],
+                "y": ocr_data["top"][i],
+                "w": ocr_data["width"][i],
+                "h": ocr_data["height"][i],
+            }
+
+    # Don't forget the last block
+    if current_parts:
+        blocks.append(TextBlock(
+            text=" ".join(current_parts),
+            page_number=page_number,
+            x=block_coords["x"],
+            y=block_coords["y"],
+            width=block_coords["w"],
+            height=block_coords["h"],
+            confidence=0.8,
+            method="ocr",
+        ))
+
+    return blocks
+
+
 # ─── CLI Entry Point ──────────────────────────────────────────────────────────
 
 if __name__ == "__main__":
@@ -251,17 +368,17 @@ if __name__ == "__main__":
     import json
 
     if len(sys.argv) < 2:
-        print("Usage: python ocr_extractor.py <pdf_path>")
+        print("Usage: python -m tools.ocr_extractor <pdf_path> [<pdf_path> ...]")
         sys.exit(1)
 
-    result = extract_text_from_pdf(sys.argv[1])
-    print(f"\n{'='*60}")
-    print(f"Extracted from: {result.file_path}")
-    print(f"Total pages: {result.total_pages}")
-    print(f"Scanned pages: {sum(1 for p in result.pages if p.is_scanned)}")
-    print(f"{'='*60}\n")
-
-    for page in result.pages:
-        print(f"--- Page {page.page_number} ({page.method}) ---")
-        print(page.full_text[:500])
-        print()
+    for result in asyncio.run(extract_many(sys.argv[1:])):
+        print(f"\n{'='*60}")
+        print(f"Extracted from: {result.file_path}")
+        print(f"Total pages: {result.total_pages}")
+        print(f"Scanned pages: {sum(1 for p in result.pages if p.is_scanned)}")
+        print(f"{'='*60}\n")
+
+        for page in result.pages:
+            print(f"--- Page {page.page_number} ({page.method}) ---")
+            print(page.full_text[:500])
+            print()
@@ -0,0 +1,63 @@
+"""
+Process Pool — shared by the CPU-bound extraction stages.
+
+Page OCR and Camelot chunks run in one long-lived pool per process instead of a
+fresh pool per document: concurrent pipelines queue their work into the same
+PROCESS_WORKERS processes, and the spawn/import cost is paid once per process.
+"""
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# Upper bound on extraction processes per worker, however many pipelines are in flight
+PROCESS_WORKERS = int(os.getenv("PROCESS_WORKERS", str(os.cpu_count() or 1)))
+
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ProcessPoolExecutor:
+    """Return the shared pool, starting it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn, not fork: callers run from worker threads of an async server
+            _pool = ProcessPoolExecutor(max_workers=PROCESS_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def _discard(pool: ProcessPoolExecutor):
+    """Drop a pool that lost a child process so the next caller starts a fresh one."""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+
+
+def run_all(fn, arg_tuples: list[tuple]) -> list:
+    """Run fn over each argument tuple on the shared pool, returning results in order."""
+    pool = get_pool()
+    try:
+        futures = [pool.submit(fn, *args) for args in arg_tuples]
+    except BrokenProcessPool:
+        # A child died under another caller before we submitted; retry once on a fresh pool
+        _discard(pool)
+        pool = get_pool()
+        futures = [pool.submit(fn, *args) for args in arg_tuples]
+    try:
+        return [future.result() for future in futures]
+    except BrokenProcessPool:
+        _discard(pool)
+        raise
+
+
+def shutdown_pool():
+    """Stop the shared pool's processes (worker shutdown hook)."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(cancel_futures=True)
+            _pool = None
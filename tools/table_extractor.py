@@ -3,35 +3,83 @@ Table Extractor — Stage 3 of Extraction Pipeline
 Detects and extracts tables from PDF documents.
 
 Strategy:
-1. Camelot lattice mode (bordered tables)
-2. Camelot stream mode (borderless tables)
-3. Tabula fallback
-4. Clean numeric values (remove $, commas, handle parentheses as negative)
+1. PyMuPDF find_tables (text PDFs — fast, no page rendering)
+2. Camelot lattice mode (bordered tables)
+3. Camelot stream mode (borderless tables)
+4. Tabula fallback
+5. Clean numeric values (remove $, commas, handle parentheses as negative)
 """
 
+import gc
+import hashlib
+import math
 import os
 import re
+import sys
+import tempfile
+from array import array
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterable
 
+import numpy as np
+import orjson
 import structlog
 
-logger = structlog.get_logger()
+from tools.process_pool import PROCESS_WORKERS, run_all
 
+logger = structlog.get_logger()
 
-@dataclass
+# Characters dropped from numeric cells: currency symbols, percent, thousands separators, and
+# whitespace (every code point str.isspace() accepts, which all sit at or below U+3000)
+_NUMERIC_NOISE = str.maketrans('', '', '$€£¥₹%,' + ''.join(c for c in map(chr, range(0x3001)) if c.isspace()))
+_DASHES = frozenset(("-", "—", "–", "−"))
+_NOT_AVAILABLE = frozenset(("n/a", "na", "nm", "n/m", "nil"))
+# Strings float() accepts as plain decimals; checked up front so label and header cells
+# are rejected by one regex match instead of a raised-and-caught ValueError
+_NUMBER = re.compile(r"[+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?")
+
+# Camelot keeps every parsed page (and its rendered image in lattice mode) alive until
+# read_pdf returns, so long documents are read this many pages at a time
+TABLE_PAGE_CHUNK = int(os.getenv("TABLE_PAGE_CHUNK", "50"))
+# Force a collection every N chunks to hand the freed page buffers back promptly
+GC_EVERY_CHUNKS = 4
+# Camelot is CPU-bound and pages are independent, so chunks are spread over the shared
+# process pool; short page ranges stay in-process
+PARALLEL_MIN_PAGES = 8
+# Opt-in: when the flavor probe can't inspect the document, run lattice and stream side by
+# side (each in-process) instead of in turn. The losing pass can't be cancelled and keeps
+# burning CPU, so this only pays off on otherwise idle workers
+RACE_CAMELOT_FLAVORS = int(os.getenv("RACE_CAMELOT_FLAVORS", "0"))
+
+# Finished extractions are stored here as JSON keyed on file content + page spec, so pipeline
+# retries skip Camelot entirely; set TABLE_CACHE_DIR="" to disable
+TABLE_CACHE_DIR = os.getenv("TABLE_CACHE_DIR", os.path.join(tempfile.gettempdir(), "tblcache"))
+TABLE_CACHE_VERSION = 5  # bump when ExtractedTable or the extraction output changes
+
+
+@dataclass(slots=True)
 class ExtractedTable:
     """A single table extracted from a document."""
     table_id: int
     page_number: int
     headers: list[str] = field(default_factory=list)
     rows: list[list[str]] = field(default_factory=list)
-    numeric_rows: list[list[float | None]] = field(default_factory=list)
+    # (n_rows, n_cols) float64, NaN where a cell isn't numeric; lists (e.g. from a
+    # checkpoint) are converted on construction. Derived from rows, so left out of ==
+    numeric_data: np.ndarray = field(default_factory=lambda: np.empty((0, 0)), compare=False)
     accuracy: float = 0.0
     method: str = "camelot_lattice"
     coordinates: dict = field(default_factory=dict)
 
+    def __post_init__(self):
+        if not isinstance(self.numeric_data, np.ndarray):
+            self.numeric_data = _numeric_array(self.numeric_data)
+
 
-@dataclass
+@dataclass(slots=True)
 class TableExtractionResult:
     """All tables extracted from a document."""
     file_path: str
@@ -39,10 +87,21 @@ class TableExtractionResult:
     total_tables: int = 0
     errors: list[str] = field(default_factory=list)
 
+    @classmethod
+    def from_dict(cls, data: dict) -> "TableExtractionResult":
+        """Rebuild from the plain-dict form orjson serializes these dataclasses to."""
+        return cls(
+            file_path=data["file_path"],
+            tables=[ExtractedTable(**t) for t in data["tables"]],
+            total_tables=data["total_tables"],
+            errors=data["errors"],
+        )
 
+
+@lru_cache(maxsize=8192)
 def clean_numeric(value: str) -> float | None:
     """
-    Clean a financial numeric string to a float.
+    Clean a financial numeric string to a float (memoized per cell string).
 
     Handles:
     - Currency symbols: $1,234.56 → 1234.56
@@ -58,39 +117,37 @@ def clean_numeric(value: str) -> float | None:
     text = value.strip()
 
     # Handle dash as zero
-    if text in ("-", "—", "–", "−"):
+    if text in _DASHES:
         return 0.0
 
     # Handle N/A, n/a, etc.
-    if text.lower() in ("n/a", "na", "nm", "n/m", "nil"):
+    if text.lower() in _NOT_AVAILABLE:
         return None
 
+    # Fast path: plain numbers ("1234.56", "-12") need none of the cleaning below
+    if _NUMBER.fullmatch(text):
+        return float(text)
+
     # Detect negative (parentheses)
     is_negative = False
     if text.startswith("(") and text.endswith(")"):
         is_negative = True
         text = text[1:-1]
 
-    # Remove currency symbols and whitespace
-    text = re.sub(r'[$€£¥₹\s]', '', text)
-
-    # Remove percentage sign (preserve value)
-    text = text.replace('%', '')
-
-    # Remove commas
-    text = text.replace(',', '')
+    # Remove currency symbols, whitespace, percentage sign (preserve value), and commas in one pass
+    text = text.translate(_NUMERIC_NOISE)
 
     # Handle negative sign
     if text.startswith("-") or text.startswith("−"):
         is_negative = True
         text = text[1:]
 
-    try:
-        result = float(text)
-        return -result if is_negative else result
-    except (ValueError, TypeError):
+    if not _NUMBER.fullmatch(text):
         return None
 
+    result = float(text)
+    return -result if is_negative else result
+
 
 def is_numeric_cell(value: str) -> bool:
     """Check if a cell value is numeric (after cleaning)."""
@@ -104,7 +161,8 @@ def extract_tables_from_pdf(
     """
     Extract all tables from a PDF document.
 
-    Uses Camelot (lattice → stream) with Tabula as fallback.
+    Uses PyMuPDF's table finder first; if it finds nothing, Camelot (lattice ↔ stream,
+    ordered by a first-page ruling-line probe) with Tabula as fallback.
 
     Args:
         file_path: Path to the PDF file.
@@ -119,48 +177,195 @@ def extract_tables_from_pdf(
         result.errors.append(f"File not found: {file_path}")
         return result
 
+    cache_path = _cache_path(file_path, pages)
+    cached = _cache_get(cache_path)
+    if cached is not None:
+        logger.info("Table extraction cache hit", file=file_path, tables_found=cached.total_tables)
+        cached.file_path = file_path
+        return cached
+
     tables = []
+    # Tables found per strategy tried, reported in one log record at the end
+    attempts: dict[str, int] = {}
 
-    # Strategy 1: Camelot lattice mode (bordered tables)
+    # Strategy 1: PyMuPDF table finder — works off the text layer, orders of magnitude
+    # faster than Camelot on text PDFs
     try:
-        tables = _extract_with_camelot(file_path, pages, flavor="lattice")
-        logger.info("Camelot lattice extraction", tables_found=len(tables))
+        tables = _extract_with_pymupdf(file_path, pages)
+        attempts["pymupdf"] = len(tables)
     except Exception as e:
-        logger.warning("Camelot lattice failed", error=str(e))
+        logger.warning("PyMuPDF table extraction failed", error=str(e))
 
-    # Strategy 2: If no tables found, try Camelot stream mode (borderless)
+    # Strategies 2 & 3: Camelot lattice (bordered tables) and stream (borderless), preferring
+    # whichever the first page's ruling lines point to, so borderless documents don't wait
+    # on a full lattice pass that finds nothing
     if not tables:
-        try:
-            tables = _extract_with_camelot(file_path, pages, flavor="stream")
-            logger.info("Camelot stream extraction", tables_found=len(tables))
-        except Exception as e:
-            logger.warning("Camelot stream failed", error=str(e))
-
-    # Strategy 3: Tabula fallback
+        first = _detect_flavor(file_path)
+        flavors = ("stream", "lattice") if first == "stream" else ("lattice", "stream")
+        if first is None and RACE_CAMELOT_FLAVORS:
+            # parallel=False: both flavors queueing every chunk into the shared process pool
+            # would hold up other pipelines' pages for a pass that gets discarded. A running Camelot pass can't be interrupted, so once
+            # lattice succeeds the stream pass finishes in the background and is discarded
+            pool = ThreadPoolExecutor(max_workers=len(flavors), thread_name_prefix="camelot")
+            futures = [pool.submit(_extract_with_camelot, file_path, pages, flavor, False) for flavor in flavors]
+            pool.shutdown(wait=False)
+        else:
+            futures = [None] * len(flavors)
+        for flavor, future in zip(flavors, futures):
+            try:
+                tables = future.result() if future else _extract_with_camelot(file_path, pages, flavor=flavor)
+                attempts[f"camelot_{flavor}"] = len(tables)
+            except Exception as e:
+                logger.warning(f"Camelot {flavor} failed", error=str(e))
+            if tables:
+                break
+
+    # Strategy 4: Tabula fallback
     if not tables:
         try:
             tables = _extract_with_tabula(file_path, pages)
-            logger.info("Tabula extraction", tables_found=len(tables))
+            attempts["tabula"] = len(tables)
         except Exception as e:
             logger.warning("Tabula failed", error=str(e))
             result.errors.append(f"All table extraction methods failed: {str(e)}")
 
+    # numeric_data was parsed by the extractors while they built each table's rows
     result.tables = tables
     result.total_tables = len(tables)
 
-    # Process numeric values for each table
-    for table in result.tables:
-        table.numeric_rows = _parse_numeric_rows(table.rows)
+    logger.info("Table extraction complete", file=file_path, tables_found=len(tables), attempts=attempts)
+
+    # Failed runs aren't cached: the next attempt may have the missing backend available
+    if not result.errors:
+        _cache_set(cache_path, result)
 
     return result
 
 
+# ─── Result Cache ────────────────────────────────────────────────────────────
+
+def _cache_path(file_path: str, pages: str) -> Path | None:
+    if not TABLE_CACHE_DIR:
+        return None
+    try:
+        with open(file_path, "rb") as f:
+            digest = hashlib.file_digest(f, "sha256").hexdigest()
+    except OSError as e:
+        logger.warning("Table cache key failed", error=str(e))
+        return None
+    spec = hashlib.sha256(pages.encode()).hexdigest()[:16]
+    return Path(TABLE_CACHE_DIR) / f"v{TABLE_CACHE_VERSION}-{digest}-{spec}.json"
+
+
+def _cache_get(path: Path | None) -> TableExtractionResult | None:
+    if path is None or not path.exists():
+        return None
+    try:
+        return TableExtractionResult.from_dict(orjson.loads(path.read_bytes()))
+    except Exception as e:
+        logger.warning("Table cache read failed", error=str(e))
+        return None
+
+
+def _cache_set(path: Path | None, result: TableExtractionResult):
+    if path is None:
+        return
+    try:
+        path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+        # Write-then-rename so a concurrent reader never sees a partial file
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(orjson.dumps(result, option=orjson.OPT_SERIALIZE_NUMPY))
+        os.replace(tmp, path)
+    except Exception as e:
+        logger.warning("Table cache write failed", error=str(e))
+
+
+# ─── Extraction Backends ─────────────────────────────────────────────────────
+
+def _extract_with_pymupdf(
+    file_path: str,
+    pages: str,
+) -> list[ExtractedTable]:
+    """Extract tables using PyMuPDF's find_tables (text layer only; scanned pages yield none)."""
+    import fitz  # PyMuPDF
+
+    extracted = []
+    with fitz.open(file_path) as doc:
+        for page_number in _resolve_pages(file_path, pages):
+            if not 1 <= page_number <= len(doc):
+                continue
+            for table in doc[page_number - 1].find_tables().tables:
+                cells = [["" if v is None else str(v).strip() for v in row] for row in table.extract()]
+                if table.header.external:
+                    # Header sits above the table's bbox, so extract() doesn't repeat it
+                    headers = ["" if h is None else str(h).strip() for h in table.header.names]
+                    rows, numeric_data = _parse_rows(cells)
+                else:
+                    headers = cells[0] if cells else []
+                    rows, numeric_data = _parse_rows(cells[1:])
+
+                x0, y0, x1, y1 = table.bbox
+                extracted.append(ExtractedTable(
+                    table_id=len(extracted) + 1,
+                    page_number=page_number,
+                    headers=headers,
+                    rows=rows,
+                    numeric_data=numeric_data,
+                    method="pymupdf",
+                    coordinates={"x": x0, "y": y0, "width": x1 - x0, "height": y1 - y0},
+                ))
+
+    return extracted
+
+
 def _extract_with_camelot(
     file_path: str,
     pages: str,
     flavor: str = "lattice",
+    parallel: bool = True,
+) -> list[ExtractedTable]:
+    """
+    Extract tables using Camelot, at most TABLE_PAGE_CHUNK pages per read_pdf call.
+
+    Ranges of PARALLEL_MIN_PAGES or more are split so every pool process gets a
+    chunk; table order (and so table_id) follows page order either way.
+    """
+    page_numbers = _resolve_pages(file_path, pages)
+    workers = min(PROCESS_WORKERS, len(page_numbers)) if parallel and len(page_numbers) >= PARALLEL_MIN_PAGES else 1
+
+    if workers > 1:
+        chunks = _chunk_pages(page_numbers, min(TABLE_PAGE_CHUNK, -(-len(page_numbers) // workers)))
+        extracted = [
+            table
+            for tables in run_all(_read_camelot_chunk, [(file_path, chunk, flavor) for chunk in chunks])
+            for table in tables
+        ]
+        for table_id, table in enumerate(extracted, start=1):
+            table.table_id = table_id
+        return extracted
+
+    extracted = []
+    for n, chunk in enumerate(_chunk_pages(page_numbers), start=1):
+        for table in _read_camelot_chunk(file_path, chunk, flavor):
+            table.table_id = len(extracted) + 1
+            extracted.append(table)
+        if n % GC_EVERY_CHUNKS == 0:
+            gc.collect()
+
+    return extracted
+
+
+def _read_camelot_chunk(
+    file_path: str,
+    pages: str,
+    flavor: str,
 ) -> list[ExtractedTable]:
-    """Extract tables using Camelot."""
+    """
+    Run Camelot over one page chunk; its DataFrames are released on return.
+
+    Also the worker entry point, so it must stay a module-level function.
+    """
     import camelot
 
     camelot_tables = camelot.read_pdf(
@@ -176,22 +381,82 @@ def _extract_with_camelot(
 
         # First row is usually headers
         headers = [str(h).strip() for h in df.iloc[0].values]
-        rows = []
-        for _, row in df.iloc[1:].iterrows():
-            rows.append([str(v).strip() for v in row.values])
+        # One object-array conversion for the body instead of a Series per row (iterrows)
+        rows, numeric_data = _parse_rows(
+            [str(v).strip() for v in row]
+            for row in df.iloc[1:].to_numpy(dtype=object).tolist()
+        )
 
         extracted.append(ExtractedTable(
             table_id=i + 1,
-            page_number=table.page,
+            page_number=int(table.page),
             headers=headers,
             rows=rows,
+            numeric_data=numeric_data,
             accuracy=table.accuracy,
-            method=f"camelot_{flavor}",
+            method=sys.intern(f"camelot_{flavor}"),
         ))
 
     return extracted
 
 
+def _detect_flavor(file_path: str) -> str | None:
+    """
+    Guess the Camelot flavor from the first page: ruled pages are "lattice", others "stream".
+
+    Returns None (inconclusive) if the page can't be inspected; callers then start with
+    "lattice", the original first strategy.
+    """
+    try:
+        import fitz  # PyMuPDF
+
+        with fitz.open(file_path) as doc:
+            if not len(doc):
+                return None
+            drawings = doc[0].get_drawings()
+    except Exception as e:
+        logger.warning("Table flavor probe failed", error=str(e))
+        return None
+
+    # Line segments and rectangle edges are what lattice mode detects cell borders from
+    ruled = any(item[0] in ("l", "re") for path in drawings for item in path["items"])
+    return "lattice" if ruled else "stream"
+
+
+def _resolve_pages(file_path: str, pages: str) -> list[int]:
+    """
+    Expand a Camelot page spec ("all", "1,3,5", "1-5", "3-end") into page numbers.
+
+    The page count is only read (via PyMuPDF) when the spec refers to the last page.
+    """
+    spec = pages.replace(" ", "").lower()
+    page_count = 0
+    if spec == "all" or "end" in spec:
+        import fitz  # PyMuPDF
+
+        with fitz.open(file_path) as doc:
+            page_count = len(doc)
+        if spec == "all":
+            return list(range(1, page_count + 1))
+
+    page_numbers = []
+    for part in spec.split(","):
+        if "-" in part:
+            lo, hi = part.split("-", 1)
+            page_numbers.extend(range(int(lo), (page_count if hi == "end" else int(hi)) + 1))
+        elif part:
+            page_numbers.append(int(part))
+    return page_numbers
+
+
+def _chunk_pages(page_numbers: list[int], size: int = TABLE_PAGE_CHUNK) -> list[str]:
+    """Split page numbers into Camelot page specs of at most `size` pages each."""
+    return [
+        ",".join(map(str, page_numbers[start:start + size]))
+        for start in range(0, len(page_numbers), size)
+    ]
+
+
 def _extract_with_tabula(
     file_path: str,
     pages: str,
@@ -213,15 +478,17 @@ def _extract_with_tabula(
             continue
 
         headers = [str(h).strip() for h in df.iloc[0].values]
-        rows = []
-        for _, row in df.iloc[1:].iterrows():
-            rows.append([str(v).strip() if str(v) != "nan" else "" for v in row.values])
+        rows, numeric_data = _parse_rows(
+            [text.strip() if (text := str(v)) != "nan" else "" for v in row]
+            for row in df.iloc[1:].to_numpy(dtype=object).tolist()
+        )
 
         extracted.append(ExtractedTable(
             table_id=i + 1,
             page_number=0,  # Tabula doesn't always report page numbers
             headers=headers,
             rows=rows,
+            numeric_data=numeric_data,
             accuracy=0.0,
             method="tabula",
         ))
@@ -229,15 +496,39 @@ def _extract_with_tabula(
     return extracted
 
 
-def _parse_numeric_rows(rows: list[list[str]]) -> list[list[float | None]]:
-    """Parse all rows into numeric values where possible."""
-    numeric_rows = []
+def _parse_rows(rows: Iterable[list[str]]) -> tuple[list[list[str]], np.ndarray]:
+    """
+    Collect cleaned string rows and their numeric parse in a single pass.
+
+    Extractors feed their row generator straight in, so each cell is parsed
+    while its row is being built rather than in a second walk over the table.
+    """
+    # Parsed values go straight into one unboxed float64 buffer (NaN for non-numeric
+    # cells) rather than a list of lists of float | None that is packed afterwards
+    text_rows, flat = [], array("d")
     for row in rows:
-        numeric_row = []
-        for cell in row:
-            numeric_row.append(clean_numeric(cell))
-        numeric_rows.append(numeric_row)
-    return numeric_rows
+        text_rows.append(row)
+        flat.extend(math.nan if (v := clean_numeric(cell)) is None else v for cell in row)
+
+    widths = set(map(len, text_rows))
+    if len(widths) == 1:
+        # Rectangular (the usual case): the buffer already is the row-major table
+        return text_rows, np.frombuffer(flat, dtype=np.float64).reshape(len(text_rows), widths.pop())
+
+    data = np.full((len(text_rows), max(widths, default=0)), np.nan)
+    start = 0
+    for i, row in enumerate(text_rows):
+        data[i, :len(row)] = flat[start:start + len(row)]
+        start += len(row)
+    return text_rows, data
+
+
+def _numeric_array(rows: list[list[float | None]]) -> np.ndarray:
+    """Pack ragged rows into a (n_rows, n_cols) float64 array; None and short rows → NaN."""
+    data = np.full((len(rows), max(map(len, rows), default=0)), np.nan)
+    for i, row in enumerate(rows):
+        data[i, :len(row)] = row
+    return data
 
 
 # ─── CLI Entry Point ──────────────────────────────────────────────────────────
@@ -246,7 +537,7 @@ if __name__ == "__main__":
     import sys
 
     if len(sys.argv) < 2:
-        print("Usage: python table_extractor.py <pdf_path>")
+        print("Usage: python -m tools.table_extractor <pdf_path>")
         sys.exit(1)
 
     result = extract_tables_from_pdf(sys.argv[1])
@@ -0,0 +1,50 @@
+"""
+Tests for conditional GETs on the agent catalogue.
+"""
+
+import sys
+import os
+import unittest
+from unittest.mock import MagicMock
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+# Mirror the container's PYTHONPATH (repo root + backend/)
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, "backend"))
+
+for name in ("camelot", "tabula", "cv2", "supabase"):
+    sys.modules.setdefault(name, MagicMock())
+
+from api.extract import _AGENTS_ETAG, router
+
+
+class TestAgentsETag(unittest.TestCase):
+
+    def setUp(self):
+        app = FastAPI()
+        app.include_router(router)
+        self.client = TestClient(app)
+
+    def status_for(self, if_none_match: str) -> int:
+        return self.client.get("/agents", headers={"If-None-Match": if_none_match}).status_code
+
+    def test_exact_tag_is_not_modified(self):
+        self.assertEqual(self.status_for(_AGENTS_ETAG), 304)
+
+    def test_weak_listed_and_wildcard_tags_match(self):
+        self.assertEqual(self.status_for(f"W/{_AGENTS_ETAG}"), 304)
+        self.assertEqual(self.status_for(f'"stale", {_AGENTS_ETAG}'), 304)
+        self.assertEqual(self.status_for("*"), 304)
+
+    def test_other_tags_get_full_body(self):
+        response = self.client.get("/agents", headers={"If-None-Match": '"stale", W/"older"'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["etag"], _AGENTS_ETAG)
+        self.assertEqual(len(response.json()), 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
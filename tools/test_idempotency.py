@@ -0,0 +1,99 @@
+"""
+Tests for the Idempotency-Key guard.
+Runs the real FastAPI dependency against an in-memory stand-in for the Redis client.
+"""
+
+import sys
+import os
+import unittest
+
+from fastapi import Depends, FastAPI, File, UploadFile
+from fastapi.testclient import TestClient
+
+# Mirror the container's PYTHONPATH (repo root + backend/)
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, "backend"))
+
+from api._idempotency import IdempotencyGuard, idempotency
+
+
+class _FakeRedis:
+    """The handful of redis.asyncio calls the guard makes, returning bytes like the real client."""
+
+    def __init__(self):
+        self.data = {}
+
+    async def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value.encode() if isinstance(value, str) else value
+        return True
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def delete(self, *keys):
+        return sum(self.data.pop(key, None) is not None for key in keys)
+
+    async def expire(self, key, seconds):
+        return key in self.data
+
+
+class TestIdempotency(unittest.TestCase):
+
+    def setUp(self):
+        self.calls = 0
+        app = FastAPI()
+        app.state.arq = _FakeRedis()
+
+        @app.post("/extract")
+        async def extract(document_id: str, idem: IdempotencyGuard = Depends(idempotency)):
+            async def handler():
+                self.calls += 1
+                return {"document_id": document_id, "run": self.calls}
+            return await idem.run(handler)
+
+        @app.post("/upload")
+        async def upload(files: list[UploadFile] = File(...), idem: IdempotencyGuard = Depends(idempotency)):
+            async def handler():
+                self.calls += 1
+                # The fingerprint pass must leave the files readable from the start
+                return {"contents": [(await f.read()).decode() for f in files], "run": self.calls}
+            return await idem.run(handler)
+
+        self.client = TestClient(app)
+
+    def test_retry_replays_stored_response(self):
+        headers = {"Idempotency-Key": "k1"}
+        first = self.client.post("/extract", params={"document_id": "a"}, headers=headers)
+        second = self.client.post("/extract", params={"document_id": "a"}, headers=headers)
+        self.assertEqual(first.json(), second.json())
+        self.assertEqual(self.calls, 1)
+
+    def test_key_reused_with_different_params_is_rejected(self):
+        headers = {"Idempotency-Key": "k1"}
+        self.client.post("/extract", params={"document_id": "a"}, headers=headers)
+        reused = self.client.post("/extract", params={"document_id": "b"}, headers=headers)
+        self.assertEqual(reused.status_code, 422)
+        self.assertEqual(self.calls, 1)
+
+    def test_upload_fingerprint_covers_file_contents(self):
+        headers = {"Idempotency-Key": "k2"}
+        first = self.client.post("/upload", files=[("files", ("a.pdf", b"one"))], headers=headers)
+        self.assertEqual(first.json()["contents"], ["one"])
+        # Same file under a new multipart boundary is a retry
+        retry = self.client.post("/upload", files=[("files", ("a.pdf", b"one"))], headers=headers)
+        self.assertEqual(retry.json(), first.json())
+        changed = self.client.post("/upload", files=[("files", ("a.pdf", b"two"))], headers=headers)
+        self.assertEqual(changed.status_code, 422)
+        self.assertEqual(self.calls, 1)
+
+    def test_no_key_runs_every_time(self):
+        self.client.post("/extract", params={"document_id": "a"})
+        self.client.post("/extract", params={"document_id": "a"})
+        self.assertEqual(self.calls, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
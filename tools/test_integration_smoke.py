@@ -3,19 +3,14 @@ import sys
 import os
 from unittest.mock import MagicMock
 
-# Add parent dir to path
+# Mirror the container's PYTHONPATH (repo root + backend/)
 sys.path.append(os.getcwd())
+sys.path.append(os.path.join(os.getcwd(), "backend"))
 
 # Mock heavy dependencies to test logic without environment issues
-sys.modules["fitz"] = MagicMock()
-sys.modules["camelot"] = MagicMock()
-sys.modules["tabula"] = MagicMock()
-sys.modules["cv2"] = MagicMock()
-sys.modules["supabase"] = MagicMock()
-sys.modules["asyncpg"] = MagicMock()
-sys.modules["sqlalchemy"] = MagicMock()
-sys.modules["redis"] = MagicMock()
-sys.modules["google.cloud"] = MagicMock() # Mock GCP
+# (setdefault: importing this twice, or after another test mocked them, keeps the existing mocks)
+for name in ("fitz", "camelot", "tabula", "cv2", "supabase", "asyncpg", "sqlalchemy", "redis", "google.cloud"):
+    sys.modules.setdefault(name, MagicMock())
 
 try:
     # Need to mock backend.database.client before importing pipeline_service
@@ -30,10 +25,10 @@ try:
     # We might need to mock backend.database first if it doesn't exist or has issues
     # Let's see if we can just rely on sys.modules mocking for external libs
     
-    from backend.services.pipeline_service import ExtractionPipelineService
+    from services.pipeline_service import ExtractionPipelineService
     print("Successfully imported ExtractionPipelineService")
     
-    from backend.models.schemas import AgentType
+    from models.schemas import AgentType
     
     service = ExtractionPipelineService("test_id", "dummy.pdf", agent_type=AgentType.CLAUDE_SPECIALIST)
     print("Successfully initialized service with CLAUDE_SPECIALIST")
@@ -12,10 +12,14 @@ from unittest.mock import patch, MagicMock
 # Add parent dir to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from tools.financial_ner import analyze_financial_document
+from tools.financial_ner import analyze_financial_document, analyze_financial_documents, _get_client, _select_financial_pages
 
 class TestFinancialNER(unittest.TestCase):
 
+    def setUp(self):
+        # Clients are memoized per key; drop any built against a previous patch
+        _get_client.cache_clear()
+
     def test_mock_response_when_no_api_key(self):
         """Verify that the tool returns structured mock data when no key provided."""
         result = analyze_financial_document("Dummy Text", [], api_key="dummy")
@@ -38,26 +42,67 @@ class TestFinancialNER(unittest.TestCase):
         mock_anthropic.return_value = mock_client
         mock_message = MagicMock()
         
-        # Mock successful JSON response from Claude
-        mock_response_text = """
-        {
+        # Mock successful tool_use response from Claude
+        mock_message.content = [MagicMock(type="tool_use", input={
             "document_type": "10-K",
             "financial_data": [],
             "agent_notes": "Test notes",
             "confidence": 0.99
-        }
-        """
-        mock_message.content = [MagicMock(text=mock_response_text)]
+        })]
         mock_client.messages.create.return_value = mock_message
 
         # Execution
-        analyze_financial_document("Test Text", [{"header": ["A"]}], api_key="sk-test-key")
+        result = analyze_financial_document("Test Text", [{"header": ["A"]}], api_key="sk-test-key")
 
         # Verification
         mock_client.messages.create.assert_called_once()
         call_args = mock_client.messages.create.call_args[1]
         self.assertEqual(call_args["model"], "claude-3-opus-20240229")
         self.assertIn("Test Text", call_args["messages"][0]["content"])
+        self.assertEqual(call_args["tool_choice"], {"type": "tool", "name": "emit_financials"})
+        self.assertEqual(result["document_type"], "10-K")
+
+    @patch("tools.financial_ner._get_cache")
+    @patch("tools.financial_ner.Anthropic")
+    def test_cache_hit_skips_api_call(self, mock_anthropic, mock_get_cache):
+        """Verify that a cached response is returned without calling Claude."""
+        mock_cache = MagicMock()
+        mock_cache.get.return_value = '{"document_type": "10-K (Cached)", "financial_data": []}'
+        mock_get_cache.return_value = mock_cache
+
+        result = analyze_financial_document("Test Text", [], api_key="sk-test-key")
+
+        self.assertEqual(result["document_type"], "10-K (Cached)")
+        mock_anthropic.assert_not_called()
+        mock_cache.setex.assert_not_called()
+
+    @patch("tools.financial_ner._get_cache", return_value=None)
+    @patch("tools.financial_ner.Anthropic")
+    def test_invalid_batch_falls_back_to_single_calls(self, mock_anthropic, _mock_get_cache):
+        """Verify that a batch failing validation is retried per document, not mocked."""
+        mock_client = MagicMock()
+        mock_anthropic.return_value = mock_client
+        single = {"document_type": "10-K", "financial_data": [], "agent_notes": "", "confidence": 0.9}
+        invalid_batch = MagicMock(content=[MagicMock(type="tool_use", input={"documents": [{"document_type": "10-K"}]})])
+        mock_client.messages.create.side_effect = [
+            invalid_batch,
+            MagicMock(content=[MagicMock(type="tool_use", input=single)]),
+            MagicMock(content=[MagicMock(type="tool_use", input=single)]),
+        ]
+
+        results = analyze_financial_documents([("Doc A", []), ("Doc B", [])], api_key="sk-test-key")
+
+        self.assertEqual(mock_client.messages.create.call_count, 3)
+        self.assertEqual([r["document_type"] for r in results], ["10-K", "10-K"])
+
+    def test_select_financial_pages_prefers_statement_pages(self):
+        """Verify that over-budget text keeps the statement page, not the head of the document."""
+        doc_text = "\f".join(["cover " * 50, "Consolidated Balance Sheets Total assets 1,000", "risk factors " * 50])
+
+        selected = _select_financial_pages(doc_text, budget=200)
+
+        self.assertEqual(selected, "Consolidated Balance Sheets Total assets 1,000")
+        self.assertEqual(_select_financial_pages("short", budget=200), "short")
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,83 @@
+"""
+Test for the worker's final persist stage.
+Runs persist_stage against the real DatabaseClient.save_extraction with a fake
+asyncpg pool, so the SQL it would issue can be checked without a database.
+"""
+
+import sys
+import os
+import asyncio
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+# Mirror the container's PYTHONPATH (repo root + backend/)
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, "backend"))
+
+for name in ("camelot", "tabula", "cv2", "supabase"):
+    sys.modules.setdefault(name, MagicMock())
+
+from database.client import DatabaseClient
+from workers import tasks
+
+
+class _FakeConnection:
+    def __init__(self):
+        self.calls = []
+
+    async def fetchval(self, query, *args):
+        self.calls.append((query, args))
+        return args[0]
+
+
+class _FakePool:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def acquire(self):
+        pool = self
+
+        class _Acquire:
+            async def __aenter__(self):
+                return pool.conn
+
+            async def __aexit__(self, *exc):
+                return False
+
+        return _Acquire()
+
+
+class TestPersistStage(unittest.TestCase):
+
+    def test_persist_updates_existing_row_by_id(self):
+        """The final write must update the trigger-time row, not INSERT (selected_agent is NOT NULL)."""
+        conn = _FakeConnection()
+        db = DatabaseClient.__new__(DatabaseClient)
+        db.pool = _FakePool(conn)
+        validate_output = {
+            "periods": ["FY2023"],
+            "statements": {"revenue": {"FY2023": 100.0}},
+            "quality_score": 95.0,
+            "metrics": {},
+        }
+        db.get_stage_output = AsyncMock(side_effect=lambda _id, stage: validate_output if stage == "validate" else None)
+        db.clear_stage_outputs = AsyncMock()
+        db.queue_status_update = MagicMock()
+        ctx = {"db": db, "redis": AsyncMock()}
+
+        with patch.object(tasks, "_pipeline_service", MagicMock()):
+            asyncio.run(tasks.persist_stage(ctx, "doc-1", "doc.pdf", "claude_specialist", "row-1", None, "run-1"))
+
+        db.queue_status_update.assert_not_called()
+        self.assertEqual(len(conn.calls), 1)
+        query, args = conn.calls[0]
+        self.assertTrue(query.startswith("UPDATE extractions SET"))
+        self.assertIn("WHERE id = $1", query)
+        self.assertNotIn("extraction_id", query)
+        self.assertEqual(args[0], "row-1")
+        db.clear_stage_outputs.assert_awaited_once_with("row-1")
+
+
+if __name__ == "__main__":
+    unittest.main()
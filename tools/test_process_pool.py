@@ -0,0 +1,36 @@
+"""
+Tests for the shared extraction process pool.
+"""
+
+import sys
+import os
+import unittest
+from concurrent.futures.process import BrokenProcessPool
+
+# Add parent dir to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools import process_pool
+
+
+class TestProcessPool(unittest.TestCase):
+
+    def tearDown(self):
+        process_pool.shutdown_pool()
+
+    def test_results_in_submission_order_on_one_pool(self):
+        pool = process_pool.get_pool()
+        self.assertEqual(process_pool.run_all(pow, [(2, 3), (3, 2), (10, 0)]), [8, 9, 1])
+        self.assertEqual(process_pool.run_all(abs, [(-4,)]), [4])
+        self.assertIs(process_pool.get_pool(), pool)
+
+    def test_crashed_child_is_replaced(self):
+        pool = process_pool.get_pool()
+        with self.assertRaises(BrokenProcessPool):
+            process_pool.run_all(os._exit, [(1,)])
+        self.assertEqual(process_pool.run_all(pow, [(2, 2)]), [4])
+        self.assertIsNot(process_pool.get_pool(), pool)
+
+
+if __name__ == "__main__":
+    unittest.main()
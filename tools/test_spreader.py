@@ -0,0 +1,35 @@
+
+"""
+Test script for the Financial Spreader taxonomy tables.
+Dict literals silently keep the last of two equal keys, so duplicates are
+checked against the source rather than the loaded mappings.
+"""
+
+import ast
+import os
+import unittest
+from collections import Counter
+
+SPREADER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "financial_spreader.py")
+MAPPING_NAMES = {"INCOME_STATEMENT_MAPPINGS", "BALANCE_SHEET_MAPPINGS", "CASH_FLOW_MAPPINGS", "XBRL_TAG_TO_STANDARD"}
+
+
+class TestSpreaderTaxonomy(unittest.TestCase):
+
+    def test_mapping_literals_have_unique_keys(self):
+        """A key repeated within one mapping literal would shadow its earlier entry."""
+        with open(SPREADER_PATH, encoding="utf-8") as f:
+            tree = ast.parse(f.read())
+
+        checked = set()
+        for node in tree.body:
+            if isinstance(node, ast.AnnAssign) and isinstance(node.value, ast.Dict) and node.target.id in MAPPING_NAMES:
+                counts = Counter(key.value for key in node.value.keys)
+                duplicates = sorted(key for key, count in counts.items() if count > 1)
+                self.assertEqual(duplicates, [], f"duplicate keys in {node.target.id}")
+                checked.add(node.target.id)
+
+        self.assertEqual(checked, MAPPING_NAMES)
+
+if __name__ == "__main__":
+    unittest.main()
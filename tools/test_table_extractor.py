@@ -0,0 +1,156 @@
+"""
+Test script for the Table Extractor's numeric parsing and result cache.
+Runs without Camelot/Tabula/PyMuPDF: only the pure-Python parsing and the
+on-disk cache are exercised.
+"""
+
+import sys
+import os
+import math
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+# Add parent dir to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools import table_extractor
+from tools.table_extractor import (
+    ExtractedTable,
+    TableExtractionResult,
+    _cache_get,
+    _cache_path,
+    _cache_set,
+    _parse_rows,
+    clean_numeric,
+)
+
+
+class TestCleanNumeric(unittest.TestCase):
+
+    def test_parentheses_are_negative(self):
+        self.assertEqual(clean_numeric("(1,234)"), -1234.0)
+        self.assertEqual(clean_numeric("($ 56.50)"), -56.5)
+
+    def test_currency_commas_and_percent_are_stripped(self):
+        self.assertEqual(clean_numeric("$1,234.56"), 1234.56)
+        self.assertEqual(clean_numeric("€ 1,234,567"), 1234567.0)
+        self.assertEqual(clean_numeric("1\u00a0234"), 1234.0)  # non-breaking space
+        self.assertEqual(clean_numeric("1 234"), 1234.0)  # non-breaking space
+
+    def test_plain_and_signed_numbers(self):
+        self.assertEqual(clean_numeric("1234.56"), 1234.56)
+        self.assertEqual(clean_numeric(" -12 "), -12.0)
+        self.assertEqual(clean_numeric("−7"), -7.0)  # U+2212 minus sign
+
+    def test_dashes_are_zero(self):
+        for dash in ("-", "—", "–", "−"):
+            self.assertEqual(clean_numeric(dash), 0.0, dash)
+
+    def test_blank_and_not_available_are_none(self):
+        for value in ("", "   ", "N/A", "n/m", "nil"):
+            self.assertIsNone(clean_numeric(value), value)
+
+    def test_non_numeric_text_is_none(self):
+        for value in ("Revenue", "FY2024 Q1", "1.2.3", "nan", "inf", "()"):
+            self.assertIsNone(clean_numeric(value), value)
+
+
+class TestParseRows(unittest.TestCase):
+
+    def test_rectangular_rows(self):
+        rows, data = _parse_rows(iter([["Revenue", "1,000", "(5)"], ["Cost", "-", "n/a"]]))
+
+        self.assertEqual(rows, [["Revenue", "1,000", "(5)"], ["Cost", "-", "n/a"]])
+        self.assertEqual(data.shape, (2, 3))
+        self.assertEqual(data.dtype, np.float64)
+        np.testing.assert_array_equal(data, [[np.nan, 1000.0, -5.0], [np.nan, 0.0, np.nan]])
+
+    def test_ragged_rows_are_padded_with_nan(self):
+        rows, data = _parse_rows(iter([["Total", "10"], ["Note"], ["Assets", "1", "2", "3"]]))
+
+        self.assertEqual([len(row) for row in rows], [2, 1, 4])
+        self.assertEqual(data.shape, (3, 4))
+        np.testing.assert_array_equal(data, [
+            [np.nan, 10.0, np.nan, np.nan],
+            [np.nan, np.nan, np.nan, np.nan],
+            [np.nan, 1.0, 2.0, 3.0],
+        ])
+
+    def test_no_rows(self):
+        rows, data = _parse_rows(iter([]))
+
+        self.assertEqual(rows, [])
+        self.assertEqual(data.shape, (0, 0))
+
+    def test_list_numeric_data_is_converted(self):
+        """Checkpointed tables carry nested lists (NaN serialized as null)."""
+        table = ExtractedTable(table_id=1, page_number=1, numeric_data=[[1.0, None], [2.5]])
+
+        self.assertIsInstance(table.numeric_data, np.ndarray)
+        np.testing.assert_array_equal(table.numeric_data, [[1.0, np.nan], [2.5, np.nan]])
+
+
+class TestTableCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.pdf_path = os.path.join(self.tmp.name, "doc.pdf")
+        with open(self.pdf_path, "wb") as f:
+            f.write(b"%PDF-1.7 test")
+        patcher = patch.object(table_extractor, "TABLE_CACHE_DIR", os.path.join(self.tmp.name, "cache"))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.tmp.cleanup)
+
+    def _result(self) -> TableExtractionResult:
+        rows, data = _parse_rows(iter([["Revenue", "$1,000", "(20)"], ["Cost", "—"]]))
+        table = ExtractedTable(
+            table_id=1,
+            page_number=3,
+            headers=["", "FY2023", "FY2024"],
+            rows=rows,
+            numeric_data=data,
+            method="pymupdf",
+            coordinates={"x": 1.5, "y": 2.0, "width": 100.0, "height": 50.0},
+        )
+        return TableExtractionResult(file_path=self.pdf_path, tables=[table], total_tables=1)
+
+    def test_round_trip_through_orjson_cache(self):
+        result = self._result()
+        path = _cache_path(self.pdf_path, "all")
+
+        _cache_set(path, result)
+        loaded = _cache_get(path)
+
+        self.assertEqual(path.suffix, ".json")
+        self.assertEqual(loaded, result)  # numeric_data is excluded from ==, compared below
+        self.assertEqual(loaded.tables[0].numeric_data.shape, (2, 3))
+        np.testing.assert_array_equal(loaded.tables[0].numeric_data, result.tables[0].numeric_data)
+        self.assertTrue(math.isnan(loaded.tables[0].numeric_data[1, 2]))
+
+    def test_key_depends_on_content_pages_and_version(self):
+        path = _cache_path(self.pdf_path, "all")
+
+        self.assertNotEqual(path, _cache_path(self.pdf_path, "1-3"))
+        self.assertTrue(path.name.startswith(f"v{table_extractor.TABLE_CACHE_VERSION}-"))
+        with patch.object(table_extractor, "TABLE_CACHE_VERSION", table_extractor.TABLE_CACHE_VERSION + 1):
+            self.assertNotEqual(path, _cache_path(self.pdf_path, "all"))
+
+        with open(self.pdf_path, "ab") as f:
+            f.write(b"changed")
+        self.assertNotEqual(path, _cache_path(self.pdf_path, "all"))
+
+    def test_cache_disabled_or_unreadable(self):
+        with patch.object(table_extractor, "TABLE_CACHE_DIR", ""):
+            self.assertIsNone(_cache_path(self.pdf_path, "all"))
+
+        path = _cache_path(self.pdf_path, "all")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"not json")
+        self.assertIsNone(_cache_get(path))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+"""
+Test script for the Validation Engine.
+Covers the vectorized tolerance checks and the flags they produce.
+"""
+
+import sys
+import os
+import unittest
+
+import numpy as np
+
+# Add parent dir to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.validation_engine import TOLERANCE_ABSOLUTE, _matches, validate_balance_sheet, validate_extraction
+
+
+class TestValidationEngine(unittest.TestCase):
+
+    def test_balance_sheet_mismatch_flags_error_with_details(self):
+        """An unbalanced period yields an error flag carrying the figures in details."""
+        statements = {
+            "total_assets": {"FY2023": 500000, "FY2024": 600000},
+            "total_liabilities": {"FY2023": 250000, "FY2024": 280000},
+            "total_equity": {"FY2023": 250000, "FY2024": 200000},
+        }
+
+        balanced, flags = validate_balance_sheet(statements, ["FY2023", "FY2024"])
+
+        self.assertFalse(balanced)
+        self.assertEqual([f.severity for f in flags], ["info", "error"])
+        self.assertEqual(flags[1].details, {"assets": 600000, "liabilities": 280000, "equity": 200000, "diff": 120000})
+
+    def test_balance_sheet_missing_values_warn(self):
+        """Missing assets or liabilities/equity warn instead of comparing."""
+        statements = {"total_assets": {"FY2024": 100.0}, "total_liabilities": {"FY2024": 60.0}}
+
+        balanced, flags = validate_balance_sheet(statements, ["FY2023", "FY2024"])
+
+        self.assertTrue(balanced)
+        self.assertEqual([f.severity for f in flags], ["warning", "warning"])
+
+    def test_matches_never_matches_missing_values(self):
+        """NaN (a None in the statements) on either side is never a match."""
+        a = np.array([np.nan, 1.0, np.nan])
+        b = np.array([1.0, np.nan, np.nan])
+
+        self.assertEqual(_matches(a, b, a).tolist(), [False, False, False])
+
+    def test_matches_zero_reference_falls_back_to_absolute_tolerance(self):
+        """A zero reference uses the larger magnitude (at least 1.0), floored at TOLERANCE_ABSOLUTE."""
+        a = np.array([0.0, 0.0, 1000.0])
+        b = np.array([TOLERANCE_ABSOLUTE, TOLERANCE_ABSOLUTE + 0.5, 1004.0])
+
+        self.assertEqual(_matches(a, b, np.zeros(3)).tolist(), [True, False, True])
+
+    def test_matches_percentage_tolerance_of_reference(self):
+        """Beyond the absolute floor, tolerance is TOLERANCE_PERCENT of the reference."""
+        a = np.array([1000000.0, 1000000.0])
+        b = np.array([1004000.0, 1006000.0])
+
+        self.assertEqual(_matches(a, b, a).tolist(), [True, False])
+
+    def test_quality_score_counts_flags(self):
+        """Each error costs 15 points and each warning 5; both count toward review."""
+        statements = {
+            "total_assets": {"FY2024": 1000000.0},
+            "total_liabilities": {"FY2024": 1.0},
+            "total_equity": {"FY2024": 1.0},
+        }
+
+        result = validate_extraction(statements, ["FY2024", "FY2025"])
+
+        self.assertEqual(result.items_flagged_for_review, 2)
+        self.assertEqual(result.quality_score, 80.0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -7,11 +7,15 @@ Validates: balance sheet equilibrium, arithmetic integrity,
            cross-statement consistency, and assigns quality scores.
 """
 
+import sys
 from dataclasses import dataclass, field
 from typing import Optional
 
+import numpy as np
 import structlog
 
+from tools.metric_calculator import series
+
 logger = structlog.get_logger()
 
 # Tolerance for floating-point comparison (0.5% of total)
@@ -20,7 +24,7 @@ TOLERANCE_PERCENT = 0.005
 TOLERANCE_ABSOLUTE = 1.0
 
 
-@dataclass
+@dataclass(slots=True)
 class ValidationFlag:
     """A single validation issue."""
     severity: str  # "error", "warning", "info"
@@ -29,7 +33,7 @@ class ValidationFlag:
     details: dict = field(default_factory=dict)
 
 
-@dataclass
+@dataclass(slots=True)
 class ValidationResult:
     """Complete validation result for an extraction."""
     balance_sheet_balanced: Optional[bool] = None
@@ -41,9 +45,10 @@ class ValidationResult:
     flags: list[ValidationFlag] = field(default_factory=list)
 
     def add_flag(self, severity: str, check: str, message: str, **details):
+        # Severities and check names come from a tiny vocabulary; share one string each
         self.flags.append(ValidationFlag(
-            severity=severity,
-            check=check,
+            severity=sys.intern(severity),
+            check=sys.intern(check),
             message=message,
             details=details,
         ))
@@ -51,16 +56,16 @@ class ValidationResult:
             self.items_flagged_for_review += 1
 
 
-def _values_match(a: Optional[float], b: Optional[float], reference: Optional[float] = None) -> bool:
-    """Check if two values match within tolerance."""
-    if a is None or b is None:
-        return False
-
-    diff = abs(a - b)
+def _matches(a: np.ndarray, b: np.ndarray, reference: np.ndarray) -> np.ndarray:
+    """
+    Check per period whether a and b match within tolerance (False wherever either is missing).
 
-    # Use percentage tolerance relative to the larger value
-    ref = reference or max(abs(a), abs(b), 1.0)
-    return diff <= max(ref * TOLERANCE_PERCENT, TOLERANCE_ABSOLUTE)
+    The tolerance is a percentage of `reference` (of the larger magnitude where the
+    reference is zero), never tighter than TOLERANCE_ABSOLUTE.
+    """
+    ref = np.where(reference != 0, reference, np.maximum(np.maximum(np.abs(a), np.abs(b)), 1.0))
+    with np.errstate(invalid="ignore"):
+        return np.abs(a - b) <= np.maximum(ref * TOLERANCE_PERCENT, TOLERANCE_ABSOLUTE)
 
 
 def validate_balance_sheet(
@@ -84,7 +89,15 @@ def validate_balance_sheet(
     total_liabilities = statements.get("total_liabilities", {})
     total_equity = statements.get("total_equity", {})
 
-    for period in periods:
+    # All tolerance checks run as one array expression; the loop below only builds flags
+    assets_arr = series(statements, "total_assets", periods)
+    balanced = _matches(
+        assets_arr,
+        series(statements, "total_liabilities", periods) + series(statements, "total_equity", periods),
+        assets_arr,
+    )
+
+    for i, period in enumerate(periods):
         assets = total_assets.get(period)
         liabilities = total_liabilities.get(period)
         equity = total_equity.get(period)
@@ -98,14 +111,14 @@ def validate_balance_sheet(
             continue
 
         expected = liabilities + equity
-        if _values_match(assets, expected, assets):
-            flags.append(ValidationFlag("info", "balance_sheet", f"Balance sheet balanced for {period}", diff=abs(assets - expected)))
+        if balanced[i]:
+            flags.append(ValidationFlag("info", "balance_sheet", f"Balance sheet balanced for {period}", {"diff": abs(assets - expected)}))
         else:
             all_balanced = False
             flags.append(ValidationFlag(
                 "error", "balance_sheet",
                 f"Balance sheet NOT balanced for {period}: Assets ({assets:,.0f}) ≠ Liabilities ({liabilities:,.0f}) + Equity ({equity:,.0f}) = {expected:,.0f}",
-                assets=assets, liabilities=liabilities, equity=equity, diff=abs(assets - expected),
+                {"assets": assets, "liabilities": liabilities, "equity": equity, "diff": abs(assets - expected)},
             ))
 
     return all_balanced, flags
@@ -128,7 +141,14 @@ def validate_income_statement(
     gross_profit = statements.get("gross_profit", {})
     operating_income = statements.get("operating_income", {})
 
-    for period in periods:
+    revenue_arr = series(statements, "total_revenue", periods)
+    gp_matches = _matches(
+        series(statements, "gross_profit", periods),
+        revenue_arr - series(statements, "cost_of_revenue", periods),
+        revenue_arr,
+    )
+
+    for i, period in enumerate(periods):
         rev = revenue.get(period)
         cost = cogs.get(period)
         gp = gross_profit.get(period)
@@ -136,7 +156,7 @@ def validate_income_statement(
         # Check: Gross Profit = Revenue - COGS
         if rev is not None and cost is not None and gp is not None:
             expected_gp = rev - cost
-            if not _values_match(gp, expected_gp, rev):
+            if not gp_matches[i]:
                 all_valid = False
                 flags.append(ValidationFlag(
                     "warning", "income_statement",
@@ -162,7 +182,14 @@ def validate_cash_flow(
     financing = statements.get("financing_cash_flow", {})
     net_change = statements.get("net_change_in_cash", {})
 
-    for period in periods:
+    op_arr = series(statements, "operating_cash_flow", periods)
+    net_matches = _matches(
+        series(statements, "net_change_in_cash", periods),
+        op_arr + series(statements, "investing_cash_flow", periods) + series(statements, "financing_cash_flow", periods),
+        np.abs(np.where(op_arr == 0, 1.0, op_arr)),
+    )
+
+    for i, period in enumerate(periods):
         op = operating.get(period)
         inv = investing.get(period)
         fin = financing.get(period)
@@ -170,7 +197,7 @@ def validate_cash_flow(
 
         if all(v is not None for v in [op, inv, fin, net]):
             expected_net = op + inv + fin
-            if not _values_match(net, expected_net, abs(op or 1)):
+            if not net_matches[i]:
                 all_valid = False
                 flags.append(ValidationFlag(
                     "warning", "cash_flow",
@@ -180,7 +207,11 @@ def validate_cash_flow(
     return all_valid, flags
 
 
-def calculate_quality_score(result: ValidationResult) -> float:
+def calculate_quality_score(
+    result: ValidationResult,
+    errors: Optional[int] = None,
+    warnings: Optional[int] = None,
+) -> float:
     """
     Calculate quality score (0-100) based on validation results.
 
@@ -189,14 +220,13 @@ def calculate_quality_score(result: ValidationResult) -> float:
     - Each error: -15 points
     - Each warning: -5 points
     - Missing data: -3 points per missing key statement
+
+    Pass `errors`/`warnings` when the flags have already been counted.
     """
-    score = 100.0
+    if errors is None or warnings is None:
+        errors, warnings = _count_severities(result.flags)
 
-    for flag in result.flags:
-        if flag.severity == "error":
-            score -= 15
-        elif flag.severity == "warning":
-            score -= 5
+    score = 100.0 - 15 * errors - 5 * warnings
 
     # Penalize missing statements
     if result.balance_sheet_balanced is None:
@@ -209,6 +239,17 @@ def calculate_quality_score(result: ValidationResult) -> float:
     return max(0.0, min(100.0, score))
 
 
+def _count_severities(flags: list[ValidationFlag]) -> tuple[int, int]:
+    """(errors, warnings) in one walk over the flags."""
+    errors = warnings = 0
+    for flag in flags:
+        if flag.severity == "error":
+            errors += 1
+        elif flag.severity == "warning":
+            warnings += 1
+    return errors, warnings
+
+
 def validate_extraction(
     statements: dict[str, dict[str, Optional[float]]],
     periods: list[str],
@@ -238,18 +279,18 @@ def validate_extraction(
     # Cross-statement (simplified — check net income appears in both IS and CF)
     result.cross_statement_consistent = True  # Will enhance later
 
-    # Calculate quality score
-    result.quality_score = calculate_quality_score(result)
-    result.items_flagged_for_review = sum(
-        1 for f in result.flags if f.severity in ("error", "warning")
-    )
+    # Count once; the score, the review counter, and the log line all share it. The check
+    # flags were extended in directly rather than via add_flag, so the counter is set here.
+    errors, warnings = _count_severities(result.flags)
+    result.quality_score = calculate_quality_score(result, errors, warnings)
+    result.items_flagged_for_review = errors + warnings
 
     logger.info(
         "Validation complete",
         quality_score=result.quality_score,
         flags=len(result.flags),
-        errors=sum(1 for f in result.flags if f.severity == "error"),
-        warnings=sum(1 for f in result.flags if f.severity == "warning"),
+        errors=errors,
+        warnings=warnings,
     )
 
     return result
@@ -258,7 +299,7 @@ def validate_extraction(
 # ─── CLI Entry Point ──────────────────────────────────────────────────────────
 
 if __name__ == "__main__":
-    # Test with sample data
+    # Test with sample data (run from the repo root: python -m tools.validation_engine)
     test_statements = {
         "total_revenue": {"FY2023": 1000000, "FY2024": 1200000},
         "cost_of_revenue": {"FY2023": 600000, "FY2024": 700000},